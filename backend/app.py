@@ -18,6 +18,13 @@ from routes.weather import weather_bp
 from routes.user_reports import user_reports_bp
 from routes.hotspots import hotspots_bp
 from routes.auth import auth_bp
+from routes.maps import maps_bp
+from routes.http_cache import compress_response
+from routes.json_provider import FastJSONProvider
+
+from services.segment_cache import segment_cache
+from services.hotspot_dataset import hotspot_dataset
+from services.compression import compression_cache
 
 # Import configuration
 from config import (
@@ -28,6 +35,7 @@ from config import (
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = SECRET_KEY
+app.json = FastJSONProvider(app)
 
 # Configure CORS based on deployment environment
 if DEPLOYMENT_ENV == 'cloud':
@@ -66,6 +74,10 @@ app.register_blueprint(weather_bp, url_prefix='/api')
 app.register_blueprint(user_reports_bp, url_prefix='/api')
 app.register_blueprint(hotspots_bp, url_prefix='/api')
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
+app.register_blueprint(maps_bp, url_prefix='/api')
+
+# Compress responses (gzip, or brotli when installed)
+app.after_request(compress_response)
 
 # Serve frontend files
 @app.route('/')
@@ -95,14 +107,30 @@ def api_status():
         'version': '1.0.0',
         'endpoints': [
             '/api/predict_risk',
+            '/api/predict_route_risk',
+            '/api/compare_routes',
             '/api/weather',
             '/api/report_risk',
+            '/api/geocode_batch',
             '/api/top_hotspots',
             '/api/auth/login',
             '/api/auth/register'
         ]
     })
 
+# Cache metrics endpoint
+@app.route('/api/metrics')
+def metrics():
+    """Report in-process cache statistics."""
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'segment_cache': segment_cache.stats(),
+            'hotspot_dataset': hotspot_dataset.stats(),
+            'compression_cache': compression_cache.stats()
+        }
+    })
+
 # Health check endpoint for load balancers
 @app.route('/health')
 def health_check():
@@ -0,0 +1,146 @@
+"""
+Benchmark Flask's default JSON provider against FastJSONProvider.
+
+Payloads mirror /api/predict_route_risk (one nested dict per point) and
+/api/data (the processed hotspots dataset as records). Each provider's
+output is decoded and compared, so the benchmark also checks that switching
+providers does not change the responses.
+
+Usage:
+    python benchmarks/json_provider_benchmark.py [--points 1000] [--rows 20000] [--repeat 5]
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routes.json_provider import FastJSONProvider, orjson
+from services.columnar_store import load_features
+
+
+def route_payload(n_points, numpy_values=False):
+    """A predict_route_risk response for an n-point route."""
+    rng = np.random.default_rng(0)
+    lats = 28.5 + np.cumsum(rng.normal(0, 0.001, n_points))
+    lons = 77.2 + np.cumsum(rng.normal(0, 0.001, n_points))
+    scores = rng.uniform(0.2, 0.8, n_points)
+    weather = {
+        'weather_condition': 'Clear', 'temperature': 25, 'humidity': 50, 'pressure': 1013,
+        'wind_speed': 0, 'visibility': 10000, 'description': 'clear sky',
+        'timestamp': '2024-01-01T12:00:00'
+    }
+    model_info = {'model_type': 'xgboost', 'features_used': 42}
+    if not numpy_values:
+        lats, lons, scores = lats.tolist(), lons.tolist(), scores.tolist()
+
+    predictions = [
+        {
+            'risk_score': score,
+            'risk_level': 'low' if score < 0.3 else 'moderate' if score < 0.6 else 'high',
+            'weather': weather,
+            'location': {'lat': lat, 'lon': lon},
+            'timestamp': '2024-01-01 12:00:00',
+            'model_info': model_info
+        }
+        for lat, lon, score in zip(lats, lons, scores)
+    ]
+    return {
+        'status': 'success',
+        'data': {
+            'route_points': [{'lat': lat, 'lon': lon} for lat, lon in zip(lats, lons)],
+            'predictions': predictions,
+            'summary': {'average_risk': float(np.mean(scores)), 'total_points': n_points}
+        }
+    }
+
+
+def hotspot_payload(n_rows):
+    """The /api/data response body for the first n_rows processed rows (synthetic if there is no data)."""
+    df = load_features()
+    if df.empty:
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({
+            'state': rng.choice(['Delhi', 'Maharashtra', 'Karnataka'], n_rows),
+            'city': rng.choice(['Dwarka', 'Pune', 'Bengaluru'], n_rows),
+            'latitude': rng.uniform(8, 35, n_rows),
+            'longitude': rng.uniform(68, 97, n_rows),
+            'hour': rng.integers(0, 24, n_rows),
+            'risk_score': rng.uniform(0, 1, n_rows)
+        })
+    data = df.head(n_rows).to_dict('records')
+    return {'status': 'success', 'data': data, 'count': len(data)}
+
+
+def _normalize(value):
+    """Decoded JSON with NaN as None (orjson writes NaN as null)."""
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def best_time(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=1000, help='points per route payload')
+    parser.add_argument('--rows', type=int, default=20000, help='rows in the hotspots payload')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+    print(f"FastJSONProvider backend: {'orjson ' + orjson.__version__ if fast.use_orjson else 'stdlib'}")
+
+    payloads = {
+        f'route ({args.points} points)': route_payload(args.points),
+        f'route ({args.points} points, numpy values)': route_payload(args.points, numpy_values=True),
+        f'hotspots ({args.rows} rows)': hotspot_payload(args.rows)
+    }
+
+    print(f"{'payload':<40} {'default ms':>11} {'fast ms':>9} {'speedup':>8} {'bytes':>10}")
+    with app.app_context():
+        for name, payload in payloads.items():
+            fast_body = fast.response(payload).get_data()
+            try:
+                default_body = default.response(payload).get_data()
+                default_time = best_time(lambda: default.response(payload).get_data(), args.repeat)
+            except TypeError:
+                # The default provider cannot encode NumPy integers or arrays
+                default_body = None
+
+            if default_body is not None:
+                assert _normalize(json.loads(default_body)) == _normalize(json.loads(fast_body)), f'{name}: outputs differ'
+
+            fast_time = best_time(lambda: fast.response(payload).get_data(), args.repeat)
+            if default_body is None:
+                print(f"{name:<40} {'n/a':>11} {fast_time * 1000:>9.1f} {'':>8} {len(fast_body):>10}")
+            else:
+                print(f"{name:<40} {default_time * 1000:>11.1f} {fast_time * 1000:>9.1f} "
+                      f"{default_time / fast_time:>7.1f}x {len(fast_body):>10}")
+
+    print('✅ Outputs of both providers decode to the same values')
+
+
+if __name__ == '__main__':
+    main()
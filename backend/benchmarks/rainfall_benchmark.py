@@ -0,0 +1,138 @@
+"""
+Benchmark the vectorized process_daily_rainfall_data against the previous
+row-by-row implementation and check that both produce the same output.
+
+The reference below is the former iterrows loop. Its day-column filter also
+matched "month" (it ends in "th"), which added the month number to every
+rainfall total; the reference is given the corrected 1st ... 31st columns,
+so the check compares the aggregation itself.
+
+Usage:
+    python benchmarks/rainfall_benchmark.py [--years 1] [--repeat 3]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import RAW_DATA_DIR
+from models.feature_engineering import process_daily_rainfall_data, DAY_COLUMN_PATTERN
+
+DAILY_RAINFALL_FILE = 'Indian Rainfall Dataset District-wise Daily Measurements.csv'
+
+
+def reference_process_daily_rainfall_data(df):
+    """The previous row-by-row implementation (with the corrected day columns)."""
+    df.columns = [col.strip().replace('"', '') for col in df.columns]
+
+    processed_records = []
+
+    for _, row in df.iterrows():
+        state = row['state']
+        district = row['district']
+        month = row['month']
+
+        daily_cols = [col for col in df.columns if DAY_COLUMN_PATTERN.match(col)]
+        daily_values = []
+
+        for col in daily_cols:
+            try:
+                val = float(row[col]) if pd.notna(row[col]) else 0
+                daily_values.append(val)
+            except:
+                daily_values.append(0)
+
+        if daily_values:
+            total_rainfall = sum(daily_values)
+            avg_rainfall = np.mean(daily_values)
+            max_rainfall = max(daily_values)
+            rainy_days = sum(1 for val in daily_values if val > 0.1)
+
+            processed_records.append({
+                'state': state,
+                'district': district,
+                'month': month,
+                'total_rainfall': total_rainfall,
+                'avg_daily_rainfall': avg_rainfall,
+                'max_daily_rainfall': max_rainfall,
+                'rainy_days_count': rainy_days,
+                'rainfall_intensity': max_rainfall / (avg_rainfall + 0.001),
+                'drought_risk': 1 if total_rainfall < 10 else 0,
+                'flood_risk': 1 if max_rainfall > 100 else 0
+            })
+
+    return pd.DataFrame(processed_records)
+
+
+def load_daily_rainfall(years):
+    """The raw daily rainfall data repeated for several years (synthetic if the file is missing)."""
+    path = os.path.join(RAW_DATA_DIR, DAILY_RAINFALL_FILE)
+    if os.path.exists(path):
+        df = pd.read_csv(path, sep=';')
+    else:
+        rng = np.random.default_rng(0)
+        n = 8790
+        df = pd.DataFrame({'state': rng.choice(['Kerala', 'Punjab'], n), 'district': rng.choice(['A', 'B'], n),
+                           'month': rng.integers(1, 13, n)})
+        days = ['1st', '2nd', '3rd'] + [f'{day}th' for day in range(4, 21)] + ['21st', '22nd', '23rd'] + \
+               [f'{day}th' for day in range(24, 31)] + ['31st']
+        for day in days:
+            df[day] = rng.gamma(0.3, 10, n)
+    return pd.concat([df] * years, ignore_index=True)
+
+
+def messy_copy(df):
+    """A copy with missing, blank and non-numeric readings in the day columns."""
+    messy = df.copy()
+    days = [col for col in messy.columns if DAY_COLUMN_PATTERN.match(col.strip().replace('"', ''))]
+    rng = np.random.default_rng(1)
+    for day in days[:5]:
+        column = messy[day].astype(object)
+        rows = rng.choice(len(messy), size=max(1, len(messy) // 20), replace=False)
+        column.iloc[rows] = rng.choice(np.array([None, '', 'NA', 'trace', ' 12.5 ', '-'], dtype=object), len(rows))
+        messy[day] = column
+    messy.iloc[:3, messy.columns.get_loc(days[-1])] = np.nan
+    return messy
+
+
+def check_equivalent(df, label):
+    expected = reference_process_daily_rainfall_data(df.copy())
+    actual = process_daily_rainfall_data(df.copy())
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False, rtol=1e-9, atol=1e-9)
+    print(f"✅ {label}: {len(actual)} rows match the reference implementation")
+
+
+def best_time(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, default=1, help='copies of the dataset to process')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = load_daily_rainfall(args.years)
+
+    check_equivalent(df, 'daily rainfall data')
+    check_equivalent(messy_copy(df), 'daily rainfall data with missing and malformed readings')
+
+    reference_time = best_time(lambda: reference_process_daily_rainfall_data(df.copy()), 1)
+    vectorized_time = best_time(lambda: process_daily_rainfall_data(df.copy()), args.repeat)
+    print(f"rows: {len(df)}")
+    print(f"row-by-row: {reference_time * 1000:.1f} ms")
+    print(f"vectorized: {vectorized_time * 1000:.1f} ms ({reference_time / vectorized_time:.0f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
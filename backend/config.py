@@ -18,7 +18,12 @@ OPENWEATHER_API_KEY = os.getenv('OPENWEATHER_API_KEY', 'your_openweather_api_key
 GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY', 'your_google_maps_api_key_here')
 
 # Security
-SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
+DEFAULT_SECRET_KEY = 'dev-secret-key-change-in-production'  # public, never used to sign tokens
+SECRET_KEY = os.getenv('SECRET_KEY', DEFAULT_SECRET_KEY)
+# Comma-separated retired secrets whose tokens are still accepted until they expire
+PREVIOUS_SECRET_KEYS = [key for key in os.getenv('PREVIOUS_SECRET_KEYS', '').split(',') if key]
+AUTH_TOKEN_TTL_SECONDS = int(os.getenv('AUTH_TOKEN_TTL_SECONDS', 7 * 24 * 3600))
+AUTH_REVOCATION_SYNC_SECONDS = 1.0  # how often workers pick up each other's logouts
 
 # Database configuration
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///accident_hotspots.db')
@@ -34,6 +39,11 @@ RAW_DATA_DIR = os.path.join(DATA_DIR, 'raw')
 PROCESSED_DATA_DIR = os.path.join(DATA_DIR, 'processed')
 MODEL_DIR = os.path.join(base_dir, 'models')
 WEATHER_CACHE_PATH = os.path.join(DATA_DIR, 'weather_cache.json')
+COLUMNAR_FEATURES_DIR = os.path.join(PROCESSED_DATA_DIR, 'comprehensive_features')
+HOTSPOT_CUBE_PATH = os.path.join(PROCESSED_DATA_DIR, 'hotspot_cube.npz')
+USERS_FILE = os.path.join(base_dir, 'routes', 'data', 'users.json')  # legacy, migrated into DATABASE_URL
+REVOKED_TOKENS_FILE = os.path.join(base_dir, 'routes', 'data', 'revoked_tokens.jsonl')
+AUTH_SECRET_KEY_FILE = os.path.join(base_dir, 'routes', 'data', 'secret_key')  # generated when SECRET_KEY is unset
 
 # Model settings
 MODEL_PATH = os.path.join(MODEL_DIR, 'enhanced_model.pkl')
@@ -43,6 +53,69 @@ FEATURE_COLUMNS = [
     'driver_age', 'car_age', 'casualty_severity', 'casualty_age', 'Severity'
 ]
 
+# User report log is folded into the snapshot after this many appended reports
+REPORT_LOG_COMPACT_THRESHOLD = int(os.getenv('REPORT_LOG_COMPACT_THRESHOLD', 10000))
+
+# Hotspots /api/data queries
+HOTSPOT_QUERY_DEFAULT_LIMIT = 1000
+HOTSPOT_QUERY_MAX_LIMIT = 10000
+EXPORT_BATCH_ROWS = 2000            # rows encoded per chunk of a streamed export
+
+# /api/top_hotspots ranking
+TOP_HOTSPOTS_DEFAULT_K = 10
+TOP_HOTSPOTS_MAX_K = 100
+TOP_HOTSPOTS_WEIGHTS = {        # weights of the combined score's components (each scaled to 0-1)
+    'accidents': 0.4,
+    'severity': 0.2,
+    'risk': 0.25,
+    'reports': 0.15
+}
+TOP_HOTSPOTS_REFRESH_SECONDS = 300  # rebuild combined rankings so report decay is reflected
+
+# Bulk report ingestion
+BULK_REPORT_BATCH_SIZE = 5000       # reports validated and geocoded together
+BULK_REPORT_MAX = 200000            # maximum reports per /api/reports/bulk request
+
+# User report density blended into risk scores
+REPORT_DENSITY_CELL_DEGREES = 0.01    # ~1 km grid cells
+REPORT_DENSITY_HALF_LIFE_HOURS = 6
+REPORT_DENSITY_SATURATION = 3.0       # density at which the full adjustment applies
+REPORT_RISK_WEIGHT = 0.3              # maximum relative risk increase from user reports
+
+# Live update stream (Server-Sent Events)
+STREAM_BUFFER_SIZE = int(os.getenv('STREAM_BUFFER_SIZE', 10000))
+STREAM_POLL_SECONDS = 1.0           # how often idle connections check for other workers' reports
+STREAM_HEARTBEAT_SECONDS = 15
+STREAM_MAX_BATCH = 500              # events sent per wake-up
+STREAM_MAX_CLIENTS = int(os.getenv('STREAM_MAX_CLIENTS', 64))  # open report streams per process (each holds a thread)
+
+# Geocoding settings
+GEOCODE_CACHE_SIZE = int(os.getenv('GEOCODE_CACHE_SIZE', 10000))
+GEOCODE_MAX_CONCURRENCY = int(os.getenv('GEOCODE_MAX_CONCURRENCY', 8))
+GEOCODE_BATCH_LIMIT = 1000  # maximum addresses per /api/geocode_batch request
+
+# Route scoring settings
+ROUTE_SAMPLE_SPACING_M = 200        # distance between scored points along a route
+ROUTE_MIN_SAMPLE_SPACING_M = 25
+ROUTE_SIMPLIFY_TOLERANCE_M = 10     # Douglas-Peucker tolerance
+ROUTE_MAX_SAMPLES = 500
+COMPARE_ROUTES_MAX = 10             # maximum alternatives per /api/compare_routes call
+ROUTE_COMPACT_SCORE_DECIMALS = 4    # risk score precision in compact route responses
+
+# Road-segment risk cache
+SEGMENT_CACHE_SIZE = int(os.getenv('SEGMENT_CACHE_SIZE', 200000))
+SEGMENT_CELL_DEGREES = 0.002        # ~200 m grid cells
+SEGMENT_BEARING_BUCKETS = 8
+
+# JSON serialization: auto (orjson when installed), orjson or stdlib
+JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'auto')
+
+# Response compression and HTTP caching
+COMPRESSION_MIN_SIZE = 1024                  # smaller bodies are sent unencoded
+COMPRESSION_LEVELS = {'gzip': 6, 'br': 4}    # per-request encoding of dynamic bodies
+COMPRESSION_CACHED_LEVELS = {'gzip': 9, 'br': 9}  # encoded once per ETag, so spend more
+COMPRESSION_CACHE_BYTES = int(os.getenv('COMPRESSION_CACHE_BYTES', 64 * 1024 * 1024))
+
 # Weather API settings
 WEATHER_CACHE_EXPIRY = 3600  # seconds (1 hour)
 WEATHER_API_BASE_URL = 'https://api.openweathermap.org/data/2.5'
@@ -3,6 +3,7 @@ Advanced Feature engineering functions for the accident risk prediction model.
 This module implements comprehensive feature extraction with temporal, geospatial,
 weather, and interaction features to achieve 85%+ model accuracy.
 """
+import re
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -17,7 +18,14 @@ warnings.filterwarnings('ignore')
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import RAW_DATA_DIR, PROCESSED_DATA_DIR
+from config import RAW_DATA_DIR, PROCESSED_DATA_DIR, COLUMNAR_FEATURES_DIR, HOTSPOT_CUBE_PATH
+from services.aggregation_cube import AggregationCube
+from services.columnar_store import save_columnar
+
+# Day-of-month columns of the daily rainfall data: 1st ... 31st (or plain 1 ... 31).
+# Earlier versions also matched "month" and added it to the rainfall totals and
+# rainy-day counts, so models trained on those features must be retrained.
+DAY_COLUMN_PATTERN = re.compile(r'^\d{1,2}(st|nd|rd|th)?$')
 
 def load_and_clean_accident_data():
     """
@@ -213,50 +221,38 @@ def load_and_process_weather_data():
 def process_daily_rainfall_data(df):
     """
     Process daily rainfall measurements into monthly aggregates.
+    
+    The day columns (1st ... 31st) are converted into one float matrix, with
+    missing or non-numeric readings counted as 0, and every statistic is an
+    array reduction over its rows.
     """
     print("Processing daily rainfall data...")
     
     # Clean column names
     df.columns = [col.strip().replace('"', '') for col in df.columns]
     
-    processed_records = []
-    
-    for _, row in df.iterrows():
-        state = row['state']
-        district = row['district']
-        month = row['month']
-        
-        # Calculate rainfall statistics from daily data
-        daily_cols = [col for col in df.columns if col.endswith(('st', 'nd', 'rd', 'th')) or col.isdigit()]
-        daily_values = []
-        
-        for col in daily_cols:
-            try:
-                val = float(row[col]) if pd.notna(row[col]) else 0
-                daily_values.append(val)
-            except:
-                daily_values.append(0)
-        
-        if daily_values:
-            total_rainfall = sum(daily_values)
-            avg_rainfall = np.mean(daily_values)
-            max_rainfall = max(daily_values)
-            rainy_days = sum(1 for val in daily_values if val > 0.1)
-            
-            processed_records.append({
-                'state': state,
-                'district': district,
-                'month': month,
-                'total_rainfall': total_rainfall,
-                'avg_daily_rainfall': avg_rainfall,
-                'max_daily_rainfall': max_rainfall,
-                'rainy_days_count': rainy_days,
-                'rainfall_intensity': max_rainfall / (avg_rainfall + 0.001),  # Avoid division by zero
-                'drought_risk': 1 if total_rainfall < 10 else 0,
-                'flood_risk': 1 if max_rainfall > 100 else 0
-            })
+    daily_cols = [col for col in df.columns if DAY_COLUMN_PATTERN.match(col)]
+    if not daily_cols or df.empty:
+        return pd.DataFrame()
     
-    return pd.DataFrame(processed_records)
+    daily_values = df[daily_cols].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(dtype=float)
+    
+    total_rainfall = daily_values.sum(axis=1)
+    avg_rainfall = daily_values.mean(axis=1)
+    max_rainfall = daily_values.max(axis=1)
+    
+    return pd.DataFrame({
+        'state': df['state'].to_numpy(),
+        'district': df['district'].to_numpy(),
+        'month': df['month'].to_numpy(),
+        'total_rainfall': total_rainfall,
+        'avg_daily_rainfall': avg_rainfall,
+        'max_daily_rainfall': max_rainfall,
+        'rainy_days_count': (daily_values > 0.1).sum(axis=1),
+        'rainfall_intensity': max_rainfall / (avg_rainfall + 0.001),  # Avoid division by zero
+        'drought_risk': (total_rainfall < 10).astype(int),
+        'flood_risk': (max_rainfall > 100).astype(int)
+    })
 
 def process_normal_rainfall_data(df):
     """
@@ -995,10 +991,14 @@ def save_processed_data():
     # Create directory if it doesn't exist
     os.makedirs(PROCESSED_DATA_DIR, exist_ok=True)
     
-    # Save comprehensive dataset
+    # Save comprehensive dataset in the columnar format used for serving
+    manifest = save_columnar(feature_df)
+    print(f"Comprehensive features saved to {COLUMNAR_FEATURES_DIR} (version {manifest['version']})")
+    
+    # CSV export for external tools
     output_path = os.path.join(PROCESSED_DATA_DIR, 'comprehensive_features.csv')
     feature_df.to_csv(output_path, index=False)
-    print(f"Comprehensive features saved to {output_path}")
+    print(f"CSV export saved to {output_path}")
     
     # Save training-ready dataset
     X, y = prepare_training_data()
@@ -1019,7 +1019,13 @@ def save_processed_data():
             'risk': len([col for col in feature_df.columns if 'risk' in col]),
             'location': len([col for col in feature_df.columns if any(x in col for x in ['state', 'city'])]),
         },
-        'target_distribution': y.value_counts().to_dict() if not y.empty else {}
+        'target_distribution': y.value_counts().to_dict() if not y.empty else {},
+        # LabelEncoder classes in code order, used by the serving-side spatial resolver
+        'category_codes': {
+            col: sorted(feature_df[col].astype(str).unique())
+            for col in ['state', 'city', 'weather', 'road_type', 'road_condition', 'lighting', 'vehicle_type']
+            if col in feature_df.columns
+        }
     }
     
     import json
@@ -1028,6 +1034,10 @@ def save_processed_data():
         json.dump(feature_info, f, indent=2)
     print(f"Feature metadata saved to {metadata_path}")
     
+    # Materialize the analytics cube served by /api/hotspots/cube
+    AggregationCube.build(feature_df).save(HOTSPOT_CUBE_PATH)
+    print(f"Aggregation cube saved to {HOTSPOT_CUBE_PATH}")
+    
     return output_path
 
 if __name__ == '__main__':
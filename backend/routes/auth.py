@@ -4,41 +4,26 @@ Authentication routes for user signin/signup functionality.
 from flask import Blueprint, request, jsonify
 import uuid
 import hashlib
-import json
+import sqlite3
 import os
+import sys
 
-auth_bp = Blueprint('auth', __name__)
-
-# Simple user storage (in production, use a proper database)
-USERS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'users.json')
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def load_users():
-    """Load users from file."""
-    try:
-        if os.path.exists(USERS_FILE):
-            with open(USERS_FILE, 'r') as f:
-                return json.load(f)
-    except:
-        pass
-    return {}
+from services.user_repository import user_repository
+from services.auth_tokens import token_service
+from routes.auth_guard import authenticate
 
-def save_users(users):
-    """Save users to file."""
-    try:
-        os.makedirs(os.path.dirname(USERS_FILE), exist_ok=True)
-        with open(USERS_FILE, 'w') as f:
-            json.dump(users, f, indent=2)
-        return True
-    except:
-        return False
+auth_bp = Blueprint('auth', __name__)
 
 def hash_password(password):
     """Simple password hashing."""
     return hashlib.sha256(password.encode()).hexdigest()
 
-def generate_token():
-    """Generate a simple token."""
-    return str(uuid.uuid4())
+def generate_token(user):
+    """Generate a signed, expiring token for a user."""
+    return token_service.issue(user)
 
 @auth_bp.route('/signup', methods=['POST'])
 def signup():
@@ -62,32 +47,27 @@ def signup():
                 'message': 'Password must be at least 6 characters long'
             }), 400
         
-        # Load existing users
-        users = load_users()
+        # Create new user (the email primary key rejects duplicates atomically)
+        try:
+            created = user_repository.create_user({
+                'name': name,
+                'email': email,
+                'password': hash_password(password),
+                'created_at': str(uuid.uuid4())  # Simple timestamp replacement
+            })
+        except sqlite3.Error:
+            return jsonify({
+                'status': 'error',
+                'message': 'Failed to create user account'
+            }), 500
         
-        # Check if user already exists
-        if email in users:
+        if not created:
             return jsonify({
                 'status': 'error',
                 'message': 'User already exists with this email'
             }), 409
         
-        # Create new user
-        token = generate_token()
-        users[email] = {
-            'name': name,
-            'email': email,
-            'password': hash_password(password),
-            'token': token,
-            'created_at': str(uuid.uuid4())  # Simple timestamp replacement
-        }
-        
-        # Save users
-        if not save_users(users):
-            return jsonify({
-                'status': 'error',
-                'message': 'Failed to create user account'
-            }), 500
+        token = generate_token({'name': name, 'email': email})
         
         return jsonify({
             'status': 'success',
@@ -120,18 +100,14 @@ def signin():
                 'message': 'Email and password are required'
             }), 400
         
-        # Load users
-        users = load_users()
-        
         # Check if user exists
-        if email not in users:
+        user = user_repository.get_user(email)
+        if user is None:
             return jsonify({
                 'status': 'error',
                 'message': 'Invalid email or password'
             }), 401
         
-        user = users[email]
-        
         # Verify password
         if user['password'] != hash_password(password):
             return jsonify({
@@ -140,9 +116,7 @@ def signin():
             }), 401
         
         # Generate new token
-        token = generate_token()
-        users[email]['token'] = token
-        save_users(users)
+        token = generate_token(user)
         
         return jsonify({
             'status': 'success',
@@ -173,20 +147,17 @@ def verify_token():
                 'message': 'Token is required'
             }), 400
         
-        # Load users
-        users = load_users()
-        
-        # Find user with this token
-        for email, user in users.items():
-            if user.get('token') == token:
-                return jsonify({
-                    'status': 'success',
-                    'message': 'Token is valid',
-                    'user': {
-                        'name': user['name'],
-                        'email': user['email']
-                    }
-                })
+        # Verify the token (signed tokens need no store lookup)
+        user = authenticate(token)
+        if user is not None:
+            return jsonify({
+                'status': 'success',
+                'message': 'Token is valid',
+                'user': {
+                    'name': user['name'],
+                    'email': user['email']
+                }
+            })
         
         return jsonify({
             'status': 'error',
@@ -212,15 +183,11 @@ def logout():
                 'message': 'Logged out successfully'
             })
         
-        # Load users
-        users = load_users()
-        
-        # Remove token from user
-        for email, user in users.items():
-            if user.get('token') == token:
-                user['token'] = ''
-                save_users(users)
-                break
+        # Revoke the token until it expires (legacy tokens are cleared from their user)
+        if token_service.is_signed(token):
+            token_service.revoke(token)
+        else:
+            user_repository.revoke_token(token)
         
         return jsonify({
             'status': 'success',
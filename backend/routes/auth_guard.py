@@ -0,0 +1,54 @@
+"""
+Token authentication shared by the API blueprints.
+"""
+from flask import request, jsonify, g
+from functools import wraps
+import os
+import sys
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.user_repository import user_repository
+from services.auth_tokens import token_service
+
+def authenticate(token):
+    """
+    Resolve a token to its user.
+    
+    Signed tokens are verified without touching the user store; legacy random
+    tokens issued before signed tokens are still looked up in the store.
+    
+    Returns:
+        dict: User name and email, or None if the token is not valid
+    """
+    if token_service.is_signed(token):
+        claims = token_service.verify(token)
+        if claims is None:
+            return None
+        return {'name': claims['name'], 'email': claims['sub']}
+    
+    user = user_repository.get_user_by_token(token)
+    if user is None:
+        return None
+    return {'name': user['name'], 'email': user['email']}
+
+def require_auth(view):
+    """
+    Require a valid token in the Authorization header ("Bearer <token>").
+    
+    The authenticated user is available to the view as flask.g.user.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        header = request.headers.get('Authorization', '')
+        token = header[7:].strip() if header.startswith('Bearer ') else ''
+        user = authenticate(token) if token else None
+        if user is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Authentication required'
+            }), 401
+        g.user = user
+        return view(*args, **kwargs)
+    return wrapper
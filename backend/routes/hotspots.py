@@ -1,70 +1,332 @@
 """
 Hotspots API endpoints.
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, stream_with_context
+import numpy as np
 import sys
 import os
-import pandas as pd
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import PROCESSED_DATA_DIR
+from config import (
+    HOTSPOT_QUERY_DEFAULT_LIMIT, HOTSPOT_QUERY_MAX_LIMIT, EXPORT_BATCH_ROWS,
+    TOP_HOTSPOTS_DEFAULT_K, TOP_HOTSPOTS_MAX_K
+)
+from services.hotspot_dataset import hotspot_dataset
+from services.hotspot_query import HotspotQueryIndex, EQUALITY_FILTERS, RANGE_FILTERS
+from services.bitmap_index import BITMAP_COLUMNS
+from services.hotspot_cube import hotspot_cube
+from services.top_hotspots import top_hotspots
+from services.spatial_resolver import CITY_CENTROIDS
+from services.dataset_export import stream_export, EXPORT_FORMATS
+from routes.http_cache import conditional
 
 hotspots_bp = Blueprint('hotspots', __name__)
 
+def _cached_response(snapshot, key, build):
+    """Serve a JSON body serialized once per dataset version."""
+    body = snapshot.cached(('body', key), lambda: current_app.json.response(build()).get_data())
+    return current_app.response_class(body, mimetype='application/json')
+
+def _not_found():
+    return jsonify({
+        'status': 'error',
+        'message': 'Hotspots data file not found'
+    }), 404
+
+def _split(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+# /data arguments that switch from the full dataset to a filtered, paged query
+QUERY_ARGS = set(EQUALITY_FILTERS) | {
+    f'{column}{suffix}' for column in RANGE_FILTERS for suffix in ('', '_min', '_max')
+} | {'fields', 'limit', 'cursor'}
+
+def _query_args(args):
+    """
+    Parse /data query arguments into filters.
+    
+    Returns:
+        tuple: (equals, ranges)
+    
+    Raises:
+        ValueError: If a numeric filter is not a number
+    """
+    equals = {column: _split(args[column]) for column in EQUALITY_FILTERS if args.get(column)}
+    
+    ranges = {}
+    for column in RANGE_FILTERS:
+        try:
+            if args.get(column):
+                value = float(args[column])
+                ranges[column] = (value, value)
+            elif args.get(f'{column}_min') or args.get(f'{column}_max'):
+                low = args.get(f'{column}_min')
+                high = args.get(f'{column}_max')
+                ranges[column] = (float(low) if low else None, float(high) if high else None)
+        except ValueError:
+            raise ValueError(f'{column} filters must be numbers')
+    
+    return equals, ranges
+
 @hotspots_bp.route('/data', methods=['GET'])
+@conditional('dataset')
 def get_hotspots_data():
-    """Get processed hotspots data."""
+    """
+    Get processed hotspots data.
+    
+    Without query arguments the full dataset is returned (other arguments,
+    e.g. cache busters, are ignored). Otherwise rows are
+    filtered by state, city, weather and severity (comma-separated values),
+    hour and month (exact value or <column>_min/<column>_max), projected to
+    the comma-separated fields, and paged with limit and cursor; pass
+    meta.next_cursor back as cursor to fetch the next page.
+    
+    format (ndjson, json, csv or npz) streams every matching row as an
+    export instead of a page.
+    """
     try:
-        # Load comprehensive features data
-        features_path = os.path.join(PROCESSED_DATA_DIR, 'comprehensive_features.csv')
-        if os.path.exists(features_path):
-            df = pd.read_csv(features_path)
-            # Convert to dict for JSON response
-            data = df.to_dict('records')
-            return jsonify({
-                'status': 'success',
-                'data': data,
-                'count': len(data)
-            })
-        else:
-            return jsonify({
-                'status': 'error',
-                'message': 'Hotspots data file not found'
-            }), 404
+        snapshot = hotspot_dataset.current()
+        if snapshot is None:
+            return _not_found()
+        
+        if request.args.get('format'):
+            return _export_hotspots(snapshot)
+        if QUERY_ARGS.intersection(request.args):
+            return _query_hotspots(snapshot)
+
+        return _stream_hotspots(snapshot)
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': str(e)
         }), 500
 
+def _stream_hotspots(snapshot):
+    """
+    Stream the full dataset in the usual {status, data, count} body.
+    
+    Rows are encoded batch by batch, so the records list and the whole
+    serialized body are never held in memory.
+    """
+    df = snapshot.df
+    rows = stream_export(df, np.arange(len(df)), list(df.columns), 'json', current_app.json.dumps, EXPORT_BATCH_ROWS)
+    
+    def generate():
+        # Keys in the order the JSON provider sorts them
+        yield f'{{"count":{len(df)},"data":'.encode('utf-8')
+        yield from rows
+        yield b',"status":"success"}\n'
+    
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/json')
+
+def _query_hotspots(snapshot):
+    """Answer a filtered /data request from the snapshot's column indexes."""
+    limit = request.args.get('limit', HOTSPOT_QUERY_DEFAULT_LIMIT, type=int)
+    limit = max(1, min(limit, HOTSPOT_QUERY_MAX_LIMIT))
+    fields = _split(request.args['fields']) if request.args.get('fields') else None
+    
+    try:
+        equals, ranges = _query_args(request.args)
+        index = snapshot.cached('query_index', lambda: HotspotQueryIndex(snapshot.df, snapshot.version, snapshot.bitmap_index))
+        records, next_cursor, total = index.query(equals, ranges, fields, limit, request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    return jsonify({
+        'status': 'success',
+        'data': records,
+        'count': len(records),
+        'meta': {
+            'total': total,
+            'limit': limit,
+            'next_cursor': next_cursor
+        }
+    })
+
+def _export_hotspots(snapshot):
+    """Stream all rows matching the /data filters in the requested format."""
+    fmt = request.args['format'].lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'status': 'error', 'message': f'format must be one of {list(EXPORT_FORMATS)}'}), 400
+    
+    fields = _split(request.args['fields']) if request.args.get('fields') else list(snapshot.df.columns)
+    unknown = [field for field in fields if field not in snapshot.df.columns]
+    if unknown:
+        return jsonify({'status': 'error', 'message': f'Unknown fields: {unknown}'}), 400
+    
+    try:
+        equals, ranges = _query_args(request.args)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    index = snapshot.cached('query_index', lambda: HotspotQueryIndex(snapshot.df, snapshot.version, snapshot.bitmap_index))
+    positions = index.positions(equals, ranges)
+    
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    chunks = stream_export(snapshot.df, positions, fields, fmt, current_app.json.dumps, EXPORT_BATCH_ROWS)
+    return current_app.response_class(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename=hotspots-{snapshot.version}.{extension}',
+            'X-Total-Count': str(len(positions))
+        }
+    )
+
 @hotspots_bp.route('/summary', methods=['GET'])
+@conditional('dataset')
 def get_hotspots_summary():
     """Get summary statistics of hotspots data."""
     try:
-        features_path = os.path.join(PROCESSED_DATA_DIR, 'comprehensive_features.csv')
-        if os.path.exists(features_path):
-            df = pd.read_csv(features_path)
-
-            summary = {
-                'total_records': len(df),
-                'columns': list(df.columns),
-                'data_types': df.dtypes.astype(str).to_dict(),
-                'numeric_summary': df.describe().to_dict() if len(df) > 0 else {}
-            }
+        snapshot = hotspot_dataset.current()
+        if snapshot is None:
+            return _not_found()
 
-            return jsonify({
-                'status': 'success',
-                'data': summary
-            })
-        else:
-            return jsonify({
-                'status': 'error',
-                'message': 'Hotspots data file not found'
-            }), 404
+        return _cached_response(snapshot, 'summary', lambda: {
+            'status': 'success',
+            'data': snapshot.summary
+        })
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+
+@hotspots_bp.route('/hotspots/filter', methods=['GET'])
+@conditional('dataset')
+def filter_hotspots():
+    """
+    Count or list accident rows matching categorical filters using bitmap indexes.
+    
+    Filters are given per column (weather, road_type, road_condition, lighting,
+    state, city, severity, vehicle_type) as comma-separated values, which are ORed; columns are
+    combined with combine=and (default) or combine=or. return=positions lists
+    matching row positions (up to limit), and group_by counts the matches per
+    value of another indexed column.
+    """
+    try:
+        snapshot = hotspot_dataset.current()
+        if snapshot is None:
+            return _not_found()
+        
+        index = snapshot.bitmap_index
+        conditions = {column: _split(request.args[column]) for column in BITMAP_COLUMNS if request.args.get(column)}
+        combine = request.args.get('combine', 'and').lower()
+        
+        try:
+            bits = index.filter(conditions, combine)
+            result = {'count': index.count(bits)}
+            
+            if request.args.get('group_by'):
+                result['group_counts'] = index.group_counts(request.args['group_by'], bits)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        
+        if request.args.get('return') == 'positions':
+            limit = request.args.get('limit', HOTSPOT_QUERY_DEFAULT_LIMIT, type=int)
+            limit = max(1, min(limit, HOTSPOT_QUERY_MAX_LIMIT))
+            result['positions'] = index.positions(bits)[:limit].tolist()
+        
+        return jsonify({
+            'status': 'success',
+            'data': result
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@hotspots_bp.route('/hotspots/cube', methods=['GET'])
+@conditional('cube')
+def get_hotspots_cube():
+    """
+    Slice and roll up the precomputed aggregation cube.
+    
+    Filters are given per dimension (state, month, hour, weather) as
+    comma-separated labels; group_by lists the dimensions to keep. Each group
+    reports its accident count, severity sum and mean risk score.
+    """
+    try:
+        cube = hotspot_cube.current()
+        if cube is None:
+            return _not_found()
+        
+        filters = {dimension: _split(request.args[dimension]) for dimension in cube.dimensions if request.args.get(dimension)}
+        group_by = list(dict.fromkeys(_split(request.args.get('group_by', ''))))
+        
+        try:
+            groups = cube.query(filters, group_by)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        
+        return jsonify({
+            'status': 'success',
+            'data': groups,
+            'meta': {
+                'dimensions': cube.dimensions,
+                'group_by': group_by,
+                'count': len(groups)
+            }
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@hotspots_bp.route('/top_hotspots', methods=['GET'])
+@hotspots_bp.route('/hotspots/top_hotspots', methods=['GET'])
+def get_top_hotspots():
+    """
+    Get the top-ranked accident hotspots.
+    
+    level is state, city or district; score is accidents, severity, risk,
+    reports (recent user report density) or combined. time_bucket (night,
+    morning, afternoon, evening) and weather restrict the accidents counted.
+    city ranks only that city (level defaults to city then).
+    
+    data has the full ranking; hotspots lists the ranked labels with a map
+    position in the shape the frontend's hotspot list uses.
+    """
+    k = request.args.get('k', TOP_HOTSPOTS_DEFAULT_K, type=int)
+    k = max(1, min(k, TOP_HOTSPOTS_MAX_K))
+    city = request.args.get('city', '').split(',')[0].strip()
+    level = request.args.get('level', 'city' if city else 'state')
+    score = request.args.get('score', 'combined')
+    bucket = request.args.get('time_bucket', 'all')
+    weather = request.args.get('weather', 'all')
+    labels = None
+    if city:
+        labels = {name for name in CITY_CENTROIDS if name.lower() == city.lower()}
+        if level == 'state':
+            labels = {CITY_CENTROIDS[name][2] for name in labels}
+    
+    try:
+        ranked = top_hotspots.top(k, level, score, bucket, weather, labels)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    return jsonify({
+        'status': 'success',
+        'data': ranked,
+        'hotspots': [
+            {
+                'location_name': hotspot[level],
+                'lat': hotspot['lat'],
+                'lng': hotspot['lon'],
+                'risk_level': hotspot['mean_risk_score'] or 0.0,
+                'incident_count': hotspot['accidents']
+            }
+            for hotspot in ranked if hotspot['lat'] is not None
+        ],
+        'meta': {
+            'k': k,
+            'level': level,
+            'score': score,
+            'time_bucket': bucket,
+            'weather': weather,
+            'city': city or None
+        }
+    })
@@ -0,0 +1,145 @@
+"""
+HTTP caching and compression helpers shared by the API routes.
+"""
+from flask import request, make_response, current_app
+from functools import wraps
+import hashlib
+import os
+import sys
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import COMPRESSION_MIN_SIZE, COMPRESSION_CACHED_LEVELS
+from services.hotspot_dataset import hotspot_dataset
+from services.hotspot_cube import hotspot_cube
+from services.user_reports import user_report_service
+from services.risk_service import risk_service
+from services.compression import (
+    compression_cache, choose_encoding, compress, compress_stream, is_compressible
+)
+
+def _dataset_version():
+    snapshot = hotspot_dataset.current()
+    return (snapshot.version, snapshot.mtime) if snapshot else None
+
+def _model_version():
+    return risk_service.model_version, risk_service.model_modified
+
+# Name -> callable returning (version, last_modified), or None when the source is missing
+VERSION_SOURCES = {
+    'dataset': _dataset_version,
+    'cube': hotspot_cube.version,
+    'reports': user_report_service.version,
+    'model': _model_version
+}
+
+def _not_modified(etag, last_modified):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def conditional(*sources):
+    """
+    Make a GET view answer conditional requests from data versions.
+    
+    The ETag combines the versions of the named VERSION_SOURCES with the
+    request path and query, and Last-Modified is the newest source's mtime.
+    A matching If-None-Match (or, without one, an If-Modified-Since at or
+    after Last-Modified) gets a 304 before the view runs. Only successful
+    responses carry the validators.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            validators = [VERSION_SOURCES[name]() for name in sources]
+            if any(validator is None for validator in validators):
+                return view(*args, **kwargs)
+    
+            digest = hashlib.sha1()
+            for version, _ in validators:
+                digest.update(f"{version}\0".encode('utf-8'))
+            digest.update(request.full_path.encode('utf-8'))
+            etag = digest.hexdigest()[:20]
+            mtimes = [mtime for _, mtime in validators if mtime is not None]
+            last_modified = int(max(mtimes)) if mtimes else None
+    
+            if request.if_none_match:
+                # Weak comparison, so the W/ tags of compressed variants match too
+                if request.if_none_match.contains_weak(etag):
+                    return _not_modified(etag, last_modified)
+            elif request.if_modified_since and last_modified is not None:
+                if last_modified <= request.if_modified_since.timestamp():
+                    return _not_modified(etag, last_modified)
+    
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                if last_modified is not None:
+                    response.last_modified = last_modified
+                response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+def compress_response(response):
+    """
+    Encode response bodies with brotli or gzip (after_request hook).
+    
+    Bodies with a strong ETag (static files, conditional API responses) are
+    served from the compressed variant cache. Streamed bodies are encoded
+    chunk by chunk. An encoded response gets a weak ETag, since it is no
+    longer byte-identical to the unencoded representation.
+    """
+    if response.status_code == 304:
+        # Same Vary as the full response would carry
+        response.vary.add('Accept-Encoding')
+        return response
+    if (request.method == 'HEAD' or response.status_code < 200
+            or response.status_code in (204, 206)
+            or 'Content-Encoding' in response.headers
+            or not is_compressible(response.mimetype)):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    
+    etag, weak = response.get_etag()
+    cacheable = etag is not None and not weak
+    
+    if response.direct_passthrough:
+        # A file from send_file; static files are small, so encode them whole
+        cached = compression_cache.get(etag, encoding) if cacheable else None
+        if cached is not None:
+            if hasattr(response.response, 'close'):
+                response.response.close()
+            body = cached
+        else:
+            response.direct_passthrough = False
+            data = response.get_data()
+            if len(data) < COMPRESSION_MIN_SIZE:
+                return response
+            body = compress(data, encoding, COMPRESSION_CACHED_LEVELS[encoding] if cacheable else None)
+            if cacheable:
+                compression_cache.put(etag, encoding, body)
+        response.set_data(body)
+    elif response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESSION_MIN_SIZE:
+            return response
+        body = compression_cache.compress(etag, encoding, data) if cacheable else compress(data, encoding)
+        response.set_data(body)
+    
+    response.headers['Content-Encoding'] = encoding
+    response.headers.pop('Accept-Ranges', None)
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    return response
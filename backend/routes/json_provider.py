@@ -0,0 +1,74 @@
+"""
+JSON provider for the Flask app.
+Encodes with orjson when it is installed (and JSON_PROVIDER allows it), and
+with the standard library otherwise. Both paths serialize NumPy scalars and
+arrays directly. orjson writes NaN and infinity as null, where the standard
+library writes the non-standard NaN/Infinity tokens.
+"""
+from flask.json.provider import DefaultJSONProvider
+import numpy as np
+import os
+import sys
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import JSON_PROVIDER
+
+def _default(o):
+    """Encode NumPy values, then whatever Flask's provider supports (dates, UUIDs, dataclasses...)."""
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if isinstance(o, np.generic):
+        return o.item()
+    return DefaultJSONProvider.default(o)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Drop-in replacement for Flask's DefaultJSONProvider.
+    
+    Calls with extra json.dumps/json.loads arguments (cls, indent, ...) are
+    passed on to the standard library, so existing callers keep working.
+    """
+    default = staticmethod(_default)
+    
+    def __init__(self, app, backend=JSON_PROVIDER):
+        super().__init__(app)
+        if backend not in ('auto', 'orjson', 'stdlib'):
+            raise ValueError(f'Unknown JSON provider: {backend}')
+        if backend == 'orjson' and orjson is None:
+            raise ValueError('JSON_PROVIDER is orjson, but orjson is not installed')
+        self.use_orjson = orjson is not None and backend != 'stdlib'
+    
+    def _options(self, indent=False):
+        # Datetimes go through _default, so they keep Flask's HTTP date format
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+    
+    def dumps(self, obj, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.dumps(obj, default=_default, option=self._options()).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+    
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+    
+    def response(self, *args, **kwargs):
+        if not self.use_orjson:
+            return super().response(*args, **kwargs)
+    
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=_default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,46 @@
+"""
+Maps API endpoints.
+"""
+from flask import Blueprint, request, jsonify
+import sys
+import os
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import GEOCODE_BATCH_LIMIT
+from services.maps_service import maps_service
+
+maps_bp = Blueprint('maps', __name__)
+
+@maps_bp.route('/geocode_batch', methods=['POST'])
+def geocode_batch():
+    """Geocode a batch of addresses."""
+    data = request.get_json()
+    
+    if not data or 'addresses' not in data:
+        return jsonify({'status': 'error', 'message': 'addresses is required'}), 400
+    
+    addresses = data['addresses']
+    if not isinstance(addresses, list) or not all(isinstance(a, str) for a in addresses):
+        return jsonify({'status': 'error', 'message': 'addresses must be a list of strings'}), 400
+    
+    if len(addresses) > GEOCODE_BATCH_LIMIT:
+        return jsonify({
+            'status': 'error',
+            'message': f'At most {GEOCODE_BATCH_LIMIT} addresses can be geocoded per request'
+        }), 400
+    
+    locations = maps_service.geocode_many(addresses)
+    
+    return jsonify({
+        'status': 'success',
+        'data': [
+            {'address': address, 'location': location}
+            for address, location in zip(addresses, locations)
+        ],
+        'meta': {
+            'total': len(addresses),
+            'resolved': sum(1 for location in locations if location)
+        }
+    })
@@ -4,12 +4,19 @@ Risk prediction API endpoints.
 from flask import Blueprint, request, jsonify
 import sys
 import os
+import numpy as np
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from config import (
+    ROUTE_SAMPLE_SPACING_M, ROUTE_MIN_SAMPLE_SPACING_M,
+    ROUTE_SIMPLIFY_TOLERANCE_M, ROUTE_MAX_SAMPLES, COMPARE_ROUTES_MAX,
+    ROUTE_COMPACT_SCORE_DECIMALS, RISK_LEVELS
+)
 from services.risk_service import risk_service
 from services.maps_service import maps_service
+from services.route_geometry import prepare_route, encode_polyline
 
 risk_bp = Blueprint('risk', __name__)
 
@@ -42,75 +49,247 @@ def predict_risk():
         'data': prediction
     })
 
-@risk_bp.route('/predict_route_risk', methods=['POST'])
-def predict_route_risk():
-    """Predict risk for a route between two points."""
-    data = request.get_json()
+def _summarize_predictions(predictions):
+    """Summarize a list of point predictions into overall route risk."""
+    if not predictions:
+        return {
+            'average_risk': 0,
+            'max_risk': None,
+            'dominant_risk_level': 'unknown'
+        }
     
-    if not data:
-        return jsonify({'status': 'error', 'message': 'No data provided'}), 400
+    avg_risk = sum(p['risk_score'] for p in predictions) / len(predictions)
+    max_risk = max(predictions, key=lambda p: p['risk_score'])
     
-    # Check if origin and destination are provided
-    if 'origin' not in data or 'destination' not in data:
-        return jsonify({'status': 'error', 'message': 'Origin and destination are required'}), 400
+    # Determine overall risk level
+    risk_levels = {
+        'low': 0,
+        'moderate': 0,
+        'high': 0,
+        'severe': 0
+    }
     
-    origin = data['origin']
-    destination = data['destination']
+    for p in predictions:
+        risk_levels[p['risk_level']] += 1
     
-    # If origin or destination is an address, geocode it
-    if isinstance(origin, str):
-        geocoded = maps_service.geocode(origin)
-        if not geocoded:
-            return jsonify({'status': 'error', 'message': 'Could not geocode origin address'}), 400
-        origin = geocoded
+    dominant_risk = max(risk_levels.items(), key=lambda x: x[1])[0]
     
-    if isinstance(destination, str):
-        geocoded = maps_service.geocode(destination)
-        if not geocoded:
-            return jsonify({'status': 'error', 'message': 'Could not geocode destination address'}), 400
-        destination = geocoded
+    return {
+        'average_risk': avg_risk,
+        'max_risk': max_risk,
+        'dominant_risk_level': dominant_risk
+    }
+
+def _sample_spacing(data):
+    """Read the requested sample spacing in meters, falling back to the default."""
+    try:
+        spacing = float(data.get('sample_spacing_m', ROUTE_SAMPLE_SPACING_M))
+    except (TypeError, ValueError):
+        spacing = ROUTE_SAMPLE_SPACING_M
+    return max(ROUTE_MIN_SAMPLE_SPACING_M, spacing)
+
+def _compact_route_response(geometry, sample_predictions, summary):
+    """
+    Build the compact predict_route_risk payload.
+    
+    The geometry is an encoded polyline, scores and risk level codes are
+    arrays aligned with its points, weather is a table of the distinct
+    conditions referenced by index, and timestamp and model info appear once.
+    """
+    levels = list(RISK_LEVELS)
+    weather_table = []
+    rows_by_content = {}
+    rows_by_id = {}  # predictions share one weather dict per weather cell
+    sample_weather = []
+    for prediction in sample_predictions:
+        weather = prediction['weather']
+        row = rows_by_id.get(id(weather))
+        if row is None:
+            key = tuple(sorted((name, str(value)) for name, value in weather.items()))
+            row = rows_by_content.get(key)
+            if row is None:
+                row = rows_by_content[key] = len(weather_table)
+                weather_table.append(weather)
+            rows_by_id[id(weather)] = row
+        sample_weather.append(row)
+    
+    point_to_sample = geometry['point_to_sample']
+    scores = np.array([p['risk_score'] for p in sample_predictions], dtype=float)
+    level_codes = np.array([levels.index(p['risk_level']) for p in sample_predictions])
     
-    # Get route points
-    route_points = maps_service.get_route(origin, destination)
+    max_risk = summary['max_risk']
+    if max_risk is not None:
+        summary['max_risk'] = {
+            'risk_score': max_risk['risk_score'],
+            'risk_level': max_risk['risk_level'],
+            'location': max_risk['location']
+        }
+    
+    first = sample_predictions[0] if sample_predictions else {}
+    return {
+        'format': 'compact',
+        'polyline': encode_polyline(geometry['points']),
+        'risk_scores': np.round(scores[point_to_sample], ROUTE_COMPACT_SCORE_DECIMALS).tolist(),
+        'risk_levels': level_codes[point_to_sample].tolist(),
+        'risk_level_names': levels,
+        'weather_index': np.array(sample_weather, dtype=np.int64)[point_to_sample].tolist(),
+        'weather': weather_table,
+        'timestamp': first.get('timestamp'),
+        'model_info': first.get('model_info'),
+        'summary': summary
+    }
+
+@risk_bp.route('/predict_route_risk', methods=['POST'])
+def predict_route_risk():
+    """
+    Predict risk along a route.
+    
+    The route geometry (route_points as a point list, or polyline as an
+    encoded polyline) is simplified and resampled before scoring, and the
+    sample scores are mapped back onto the original points.
     
-    if not route_points:
-        return jsonify({'status': 'error', 'message': 'Could not find route'}), 400
+    With format=compact the response carries the geometry as an encoded
+    polyline (precision 5), parallel arrays of risk scores, risk level codes
+    (indexes into risk_level_names) and weather indexes (into the weather
+    table), and the timestamp and model info once, instead of one object
+    per point.
+    """
+    data = request.get_json(silent=True)
     
-    # Predict risk for each point
-    predictions = risk_service.predict_route_risk(route_points)
+    if not data:
+        return jsonify({'status': 'error', 'message': 'No data provided'}), 400
+    if not isinstance(data, dict):
+        return jsonify({'status': 'error', 'message': 'Request body must be a JSON object'}), 400
+    
+    route = data.get('route_points') or data.get('polyline')
     
-    # Calculate overall route risk
-    if predictions:
-        avg_risk = sum(p['risk_score'] for p in predictions) / len(predictions)
-        max_risk = max(predictions, key=lambda p: p['risk_score'])
+    if not route:
+        # Without a geometry, score the straight line between origin and destination
+        if 'origin' not in data or 'destination' not in data:
+            return jsonify({'status': 'error', 'message': 'route_points, polyline or origin and destination are required'}), 400
         
-        # Determine overall risk level
-        risk_levels = {
-            'low': 0,
-            'moderate': 0,
-            'high': 0,
-            'severe': 0
-        }
+        origin = data['origin']
+        destination = data['destination']
+        
+        # If origin or destination is an address, geocode it
+        if isinstance(origin, str):
+            geocoded = maps_service.geocode(origin)
+            if not geocoded:
+                return jsonify({'status': 'error', 'message': 'Could not geocode origin address'}), 400
+            origin = geocoded
         
-        for p in predictions:
-            risk_levels[p['risk_level']] += 1
+        if isinstance(destination, str):
+            geocoded = maps_service.geocode(destination)
+            if not geocoded:
+                return jsonify({'status': 'error', 'message': 'Could not geocode destination address'}), 400
+            destination = geocoded
         
-        dominant_risk = max(risk_levels.items(), key=lambda x: x[1])[0]
-    else:
-        avg_risk = 0
-        max_risk = None
-        dominant_risk = 'unknown'
+        route = [origin, destination]
+    
+    try:
+        geometry = prepare_route(route, _sample_spacing(data), ROUTE_SIMPLIFY_TOLERANCE_M, ROUTE_MAX_SAMPLES)
+    except (ValueError, KeyError, TypeError, IndexError):
+        return jsonify({'status': 'error', 'message': 'Invalid route geometry'}), 400
+    
+    # Score the resampled points
+    sample_points = [{'lat': float(lat), 'lon': float(lon)} for lat, lon in geometry['samples']]
+    sample_predictions = risk_service.predict_route_risk(sample_points)
+    
+    # Samples are evenly spaced, so summarize over them rather than the raw vertices
+    summary = _summarize_predictions(sample_predictions)
+    summary.update({
+        'total_points': len(geometry['points']),
+        'scored_points': len(sample_predictions),
+        'route_length_m': geometry['length_m']
+    })
+    
+    if data.get('format') == 'compact':
+        return jsonify({
+            'status': 'success',
+            'data': _compact_route_response(geometry, sample_predictions, summary)
+        })
+    
+    # Map sample scores back onto the original points, keeping predictions aligned with route_points
+    route_points = route if isinstance(route, list) else [
+        {'lat': float(lat), 'lon': float(lon)} for lat, lon in geometry['points']
+    ]
+    predictions = [
+        {**sample_predictions[sample], 'location': {'lat': float(lat), 'lon': float(lon)}}
+        for (lat, lon), sample in zip(geometry['points'], geometry['point_to_sample'])
+    ]
     
     return jsonify({
         'status': 'success',
         'data': {
             'route_points': route_points,
             'predictions': predictions,
-            'summary': {
-                'average_risk': avg_risk,
-                'max_risk': max_risk,
-                'dominant_risk_level': dominant_risk,
-                'total_points': len(predictions)
-            }
+            'summary': summary
         }
-    })
\ No newline at end of file
+    })
+
+@risk_bp.route('/compare_routes', methods=['POST'])
+def compare_routes():
+    """
+    Score several alternative routes in one call and rank them by risk.
+    
+    Each entry of routes is an encoded polyline, a list of points, or an
+    object with route_points or polyline and an optional id.
+    """
+    data = request.get_json(silent=True)
+    
+    if not data:
+        return jsonify({'status': 'error', 'message': 'No data provided'}), 400
+    if not isinstance(data, dict):
+        return jsonify({'status': 'error', 'message': 'Request body must be a JSON object'}), 400
+    
+    routes = data.get('routes')
+    if not isinstance(routes, list) or not routes:
+        return jsonify({'status': 'error', 'message': 'routes must be a non-empty list'}), 400
+    
+    if len(routes) > COMPARE_ROUTES_MAX:
+        return jsonify({'status': 'error', 'message': f'At most {COMPARE_ROUTES_MAX} routes can be compared'}), 400
+    
+    spacing = _sample_spacing(data)
+    route_ids = []
+    geometries = []
+    for index, route in enumerate(routes):
+        route_id = index
+        if isinstance(route, dict):
+            route_id = route.get('id', index)
+            route = route.get('route_points') or route.get('polyline')
+        try:
+            geometries.append(prepare_route(route, spacing, ROUTE_SIMPLIFY_TOLERANCE_M, ROUTE_MAX_SAMPLES))
+        except (ValueError, KeyError, TypeError, IndexError):
+            return jsonify({'status': 'error', 'message': f'Invalid geometry for route {route_id}'}), 400
+        route_ids.append(route_id)
+    
+    # Score the samples of every route in a single batch
+    sample_routes = [
+        [{'lat': float(lat), 'lon': float(lon)} for lat, lon in geometry['samples']]
+        for geometry in geometries
+    ]
+    route_predictions = risk_service.predict_routes_risk(sample_routes)
+    
+    summaries = []
+    for route_id, geometry, predictions in zip(route_ids, geometries, route_predictions):
+        summary = _summarize_predictions(predictions)
+        summary.update({
+            'id': route_id,
+            'total_points': len(geometry['points']),
+            'scored_points': len(predictions),
+            'route_length_m': geometry['length_m']
+        })
+        summaries.append(summary)
+    
+    # Safest route first
+    summaries.sort(key=lambda s: s['average_risk'])
+    for rank, summary in enumerate(summaries, 1):
+        summary['rank'] = rank
+    
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'routes': summaries,
+            'safest_route': summaries[0]['id']
+        }
+    })
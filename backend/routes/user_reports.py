@@ -1,21 +1,39 @@
 """
 User reports API endpoints.
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 import sys
 import os
+import io
+import csv
+import json
+import time
+import threading
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from config import (
+    STREAM_POLL_SECONDS, STREAM_HEARTBEAT_SECONDS, STREAM_MAX_BATCH, STREAM_MAX_CLIENTS,
+    BULK_REPORT_BATCH_SIZE, BULK_REPORT_MAX
+)
 from services.user_reports import user_report_service
+from services.event_stream import event_stream
 from services.maps_service import maps_service
+from routes.http_cache import conditional
+from routes.auth_guard import require_auth
 
 user_reports_bp = Blueprint('user_reports', __name__)
 
+VALID_RISK_LEVELS = ['low', 'moderate', 'high', 'severe']
+
+# Open /reports/stream connections in this process
+_stream_slots = threading.BoundedSemaphore(STREAM_MAX_CLIENTS)
+
 @user_reports_bp.route('/report_risk', methods=['POST'])
+@require_auth
 def report_risk():
-    """Submit a user risk report."""
+    """Submit a user risk report (requires a signed-in user's token)."""
     data = request.get_json()
     
     if not data:
@@ -35,9 +53,8 @@ def report_risk():
         data['location'] = geocoded
     
     # Validate risk level
-    valid_risk_levels = ['low', 'moderate', 'high', 'severe']
-    if data['risk_level'] not in valid_risk_levels:
-        return jsonify({'status': 'error', 'message': f'Invalid risk level. Must be one of {valid_risk_levels}'}), 400
+    if data['risk_level'] not in VALID_RISK_LEVELS:
+        return jsonify({'status': 'error', 'message': f'Invalid risk level. Must be one of {VALID_RISK_LEVELS}'}), 400
     
     # Add report
     report = user_report_service.add_report(data)
@@ -47,31 +64,215 @@ def report_risk():
         'data': report
     })
 
+def _iter_bulk_records(stream, fmt):
+    """
+    Parse a request body stream line by line.
+    
+    Yields:
+        tuple: (line_number, record dict or None, error message or None)
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+    
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            yield line_number, None, 'Invalid JSON'
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, 'Each line must be a JSON object'
+            continue
+        yield line_number, record, None
+
+def _normalize_bulk_record(record):
+    """
+    Validate a bulk record and build a report from it.
+    
+    Location may be a {lat, lon} object, an address string, separate lat/lon
+    fields (as CSV columns), or an address field.
+    
+    Returns:
+        tuple: (report, error message); report['location'] is an address string
+            when the record still needs geocoding
+    """
+    for field in ('risk_level', 'description'):
+        if not record.get(field):
+            return None, f'{field} is required'
+    
+    if record['risk_level'] not in VALID_RISK_LEVELS:
+        return None, f'Invalid risk level. Must be one of {VALID_RISK_LEVELS}'
+    
+    location = record.get('location')
+    if location in (None, '') and record.get('lat') not in (None, '') and record.get('lon') not in (None, ''):
+        location = {'lat': record['lat'], 'lon': record['lon']}
+    if location in (None, ''):
+        location = record.get('address')
+    
+    if isinstance(location, dict):
+        try:
+            location = dict(location, lat=float(location['lat']), lon=float(location['lon']))
+        except (KeyError, TypeError, ValueError):
+            return None, 'location must have numeric lat and lon'
+        if not (-90 <= location['lat'] <= 90 and -180 <= location['lon'] <= 180):
+            return None, 'location is out of range'
+    elif not isinstance(location, str) or not location.strip():
+        return None, 'location is required'
+    
+    report = {
+        'location': location,
+        'risk_level': record['risk_level'],
+        'description': record['description']
+    }
+    
+    timestamp = record.get('timestamp')
+    if timestamp not in (None, ''):
+        try:
+            report['timestamp'] = int(float(timestamp))
+        except (TypeError, ValueError, OverflowError):
+            # float() accepts "inf" and "1e400", which int() cannot convert
+            return None, 'timestamp must be a Unix time in seconds'
+    
+    return report, None
+
+def _geocode_pending(batch, errors):
+    """Geocode address locations of a batch in one deduplicated call; returns resolved reports."""
+    addresses = [report['location'] for _, report in batch if isinstance(report['location'], str)]
+    locations = iter(maps_service.geocode_many(addresses)) if addresses else iter(())
+    
+    resolved = []
+    for line_number, report in batch:
+        if isinstance(report['location'], str):
+            location = next(locations)
+            if not location:
+                errors.append({'line': line_number, 'message': 'Could not geocode address'})
+                continue
+            report['location'] = location
+        resolved.append(report)
+    return resolved
+
+@user_reports_bp.route('/reports/bulk', methods=['POST'])
+@require_auth
+def bulk_reports():
+    """
+    Ingest many user reports from an NDJSON or CSV body.
+    
+    The body is parsed as a stream; records are validated and geocoded in
+    batches, and all accepted reports are appended in a single group commit.
+    The format comes from the format argument or the Content-Type header.
+    Requires a signed-in user's token.
+    """
+    fmt = request.args.get('format')
+    if not fmt:
+        fmt = 'csv' if request.mimetype in ('text/csv', 'application/csv') else 'ndjson'
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({'status': 'error', 'message': 'format must be ndjson or csv'}), 400
+    
+    accepted = []
+    errors = []
+    batch = []
+    total = 0
+    
+    try:
+        for line_number, record, error in _iter_bulk_records(request.stream, fmt):
+            total += 1
+            if total > BULK_REPORT_MAX:
+                return jsonify({'status': 'error', 'message': f'At most {BULK_REPORT_MAX} reports can be ingested per request'}), 400
+            
+            if error is None:
+                report, error = _normalize_bulk_record(record)
+            if error is not None:
+                errors.append({'line': line_number, 'message': error})
+                continue
+            
+            batch.append((line_number, report))
+            if len(batch) >= BULK_REPORT_BATCH_SIZE:
+                accepted.extend(_geocode_pending(batch, errors))
+                batch = []
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'status': 'error', 'message': f'Could not parse request body: {e}'}), 400
+    
+    accepted.extend(_geocode_pending(batch, errors))
+    
+    # One group commit and one index pass for the whole upload
+    user_report_service.add_reports(accepted)
+    
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'accepted': len(accepted),
+            'rejected': len(errors),
+            'errors': errors[:100]
+        }
+    })
+
 @user_reports_bp.route('/reports', methods=['GET'])
+@conditional('reports')
 def get_reports():
-    """Get user reports."""
+    """
+    Get user reports.
+    
+    Without offset, reports are paged in commit order with an opaque cursor;
+    pass meta.next_cursor back as cursor to fetch the next page or to tail
+    new reports (including late-committed ones with older timestamps).
+    since/until filter by timestamp (pages then follow timestamp order) and
+    fields selects a comma-separated subset of report fields.
+    """
     limit = request.args.get('limit', 100, type=int)
-    offset = request.args.get('offset', 0, type=int)
     
-    reports = user_report_service.get_reports(limit, offset)
+    if 'offset' in request.args and 'cursor' not in request.args:
+        offset = request.args.get('offset', 0, type=int)
+        reports = user_report_service.get_reports(limit, offset)
+        
+        return jsonify({
+            'status': 'success',
+            'data': reports,
+            'meta': {
+                'total': user_report_service.count_reports(),
+                'count': len(reports),
+                'limit': limit,
+                'offset': offset
+            }
+        })
+    
+    cursor = request.args.get('cursor')
+    since = request.args.get('since', type=float)
+    until = request.args.get('until', type=float)
+    fields = request.args.get('fields')
+    fields = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+    
+    try:
+        reports, next_cursor, total = user_report_service.query_reports(limit, cursor, since, until, fields)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     
     return jsonify({
         'status': 'success',
         'data': reports,
         'meta': {
-            'total': len(reports),
+            'total': total,
+            'count': len(reports),
             'limit': limit,
-            'offset': offset
+            'next_cursor': next_cursor
         }
     })
 
 @user_reports_bp.route('/reports/nearby', methods=['GET'])
+@conditional('reports')
 def get_nearby_reports():
     """Get user reports near a location."""
     lat = request.args.get('lat')
     lon = request.args.get('lon')
     address = request.args.get('address')
     radius = request.args.get('radius', 5, type=float)
+    precise = request.args.get('precise', 'false').lower() in ('true', '1')
     
     if not (lat and lon) and not address:
         return jsonify({'status': 'error', 'message': 'Either lat/lon or address is required'}), 400
@@ -87,7 +288,7 @@ def get_nearby_reports():
     location = {'lat': float(lat), 'lon': float(lon)}
     
     # Get nearby reports
-    reports = user_report_service.get_reports_near_location(location, radius)
+    reports = user_report_service.get_reports_near_location(location, radius, precise)
     
     return jsonify({
         'status': 'success',
@@ -96,4 +297,118 @@ def get_nearby_reports():
             'total': len(reports),
             'radius_km': radius
         }
-    })
\ No newline at end of file
+    })
+
+def _parse_bbox(bbox):
+    """
+    Parse a "west,south,east,north" bounding box.
+    
+    Returns:
+        tuple: (west, south, east, north) or None when not provided
+        
+    Raises:
+        ValueError: If the bounding box is malformed
+    """
+    if not bbox:
+        return None
+    west, south, east, north = (float(v) for v in bbox.split(','))
+    if south > north:
+        raise ValueError('south must not exceed north')
+    return west, south, east, north
+
+def _in_bbox(bbox, lat, lon):
+    if bbox is None or lat is None:
+        return True
+    west, south, east, north = bbox
+    if not south <= lat <= north:
+        return False
+    # Boxes crossing the antimeridian have west > east
+    return west <= lon <= east if west <= east else lon >= west or lon <= east
+
+def _sse(event_type, data, event_id=None):
+    """Format one Server-Sent Event."""
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines.append(f'event: {event_type}')
+    lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+    return '\n'.join(lines) + '\n\n'
+
+@user_reports_bp.route('/reports/stream', methods=['GET'])
+def stream_reports():
+    """
+    Stream new reports and changed cell risk as Server-Sent Events.
+    
+    bbox ("west,south,east,north") limits events to an area. Clients resume
+    after a reconnect with the Last-Event-ID header; a client that falls
+    behind the server buffer, or resumes with an ID this worker never issued
+    (after a restart or on another worker), receives a resync event and
+    should refetch /api/reports before continuing. Bulk uploads are announced
+    by a single reports_bulk event with the report count and bounds instead
+    of one event per report.
+    
+    Each open stream occupies a worker thread for its lifetime, so run the
+    app with a threaded (gunicorn --worker-class gthread) or gevent worker;
+    with sync workers one client blocks a whole worker. At most
+    STREAM_MAX_CLIENTS streams are open per process; further clients get 503.
+    """
+    try:
+        bbox = _parse_bbox(request.args.get('bbox'))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'bbox must be west,south,east,north'}), 400
+    
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    try:
+        start_seq = int(last_event_id) if last_event_id else event_stream.last_seq
+    except ValueError:
+        start_seq = event_stream.last_seq
+    
+    def generate():
+        seq = start_seq
+        last_write = time.time()
+        yield 'retry: 3000\n\n'
+        
+        while True:
+            events, dropped = event_stream.read(seq, STREAM_POLL_SECONDS, STREAM_MAX_BATCH)
+            wrote = False
+            
+            if dropped:
+                if not events:
+                    # The client's position is unknown to this stream (restart or other worker); continue from now
+                    seq = event_stream.last_seq
+                yield _sse('resync', {'reason': 'events since the client position are not available'})
+                wrote = True
+            
+            if events:
+                seq = events[-1][0]
+                chunk = ''.join(
+                    _sse(event_type, data, event_seq)
+                    for event_seq, event_type, lat, lon, data in events
+                    if _in_bbox(bbox, lat, lon)
+                )
+                if chunk:
+                    yield chunk
+                    wrote = True
+            
+            if wrote:
+                last_write = time.time()
+                continue
+            
+            # Nothing sent (idle, or every event was outside the bbox): pick up
+            # reports from other workers and keep the connection alive
+            user_report_service.refresh()
+            if time.time() - last_write >= STREAM_HEARTBEAT_SECONDS:
+                yield ': keep-alive\n\n'
+                last_write = time.time()
+    
+    if not _stream_slots.acquire(blocking=False):
+        return jsonify({
+            'status': 'error',
+            'message': 'Too many open report streams, try again later'
+        }), 503, {'Retry-After': str(STREAM_HEARTBEAT_SECONDS)}
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Runs when the server closes the response, also if the stream never started
+    response.call_on_close(_stream_slots.release)
+    return response
@@ -0,0 +1,158 @@
+"""
+Aggregation cube over the processed accident data.
+Counts, severity sums and risk score sums are materialized once into dense
+NumPy arrays indexed by (state, month, hour, weather). Queries slice the
+arrays by label and sum out the dimensions that are not grouped, so their
+cost depends on the cube's shape and never on the number of rows.
+"""
+import json
+import numpy as np
+import pandas as pd
+
+CUBE_DIMENSIONS = ['state', 'month', 'hour', 'weather']
+NUMERIC_DIMENSIONS = {'month', 'hour'}
+
+
+class AggregationCube:
+    def __init__(self, dimensions, labels, counts, severity_sum, risk_sum):
+        self.dimensions = list(dimensions)
+        self.labels = labels  # dimension -> list of labels in axis order
+        self.counts = counts
+        self.severity_sum = severity_sum
+        self.risk_sum = risk_sum
+        self._positions = {
+            dimension: {str(label): i for i, label in enumerate(labels[dimension])}
+            for dimension in self.dimensions
+        }
+
+    @classmethod
+    def build(cls, df, dimensions=CUBE_DIMENSIONS):
+        """
+        Materialize the cube from processed accident rows.
+
+        Rows missing a dimension value are left out. Severity is summed from
+        severity_level (0 = minor, 1 = moderate/serious, 2 = severe/fatal).
+
+        Args:
+            df (pd.DataFrame): Processed features
+            dimensions (list, optional): Cube dimensions. Defaults to CUBE_DIMENSIONS.
+
+        Returns:
+            AggregationCube: The built cube
+        """
+        columns = {}
+        for dimension in dimensions:
+            column = df[dimension]
+            if dimension in NUMERIC_DIMENSIONS:
+                column = pd.to_numeric(column, errors='coerce').astype('Int64')
+            columns[dimension] = column
+
+        valid = np.ones(len(df), dtype=bool)
+        for column in columns.values():
+            valid &= column.notna().to_numpy()
+
+        labels = {}
+        codes = []
+        for dimension, column in columns.items():
+            column = column[valid]
+            dimension_labels = sorted(column.unique().tolist())
+            labels[dimension] = [int(label) if dimension in NUMERIC_DIMENSIONS else str(label) for label in dimension_labels]
+            codes.append(pd.Categorical(column, categories=dimension_labels).codes.astype(np.int64))
+
+        shape = tuple(len(labels[dimension]) for dimension in dimensions)
+        flat = np.ravel_multi_index(codes, shape) if codes and len(codes[0]) else np.empty(0, dtype=np.int64)
+        size = int(np.prod(shape))
+
+        def measure(column):
+            if column not in df:
+                return np.zeros(shape)
+            weights = pd.to_numeric(df[column], errors='coerce').fillna(0).to_numpy(dtype=float)[valid]
+            return np.bincount(flat, weights=weights, minlength=size).reshape(shape)
+
+        counts = np.bincount(flat, minlength=size).astype(np.int32).reshape(shape)
+        return cls(dimensions, labels, counts, measure('severity_level'), measure('risk_score'))
+
+    @staticmethod
+    def _label_key(dimension, label):
+        """Lookup key of a filter label, so "6", "6.0" and 6 all select month 6."""
+        if dimension in NUMERIC_DIMENSIONS:
+            try:
+                return str(int(float(label)))
+            except (TypeError, ValueError):
+                pass
+        return str(label)
+
+    def save(self, path):
+        """Save the cube arrays and labels to an .npz file."""
+        np.savez_compressed(
+            path,
+            counts=self.counts,
+            severity_sum=self.severity_sum,
+            risk_sum=self.risk_sum,
+            meta=np.array(json.dumps({'dimensions': self.dimensions, 'labels': self.labels}))
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load a cube saved with save()."""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            return cls(meta['dimensions'], meta['labels'], data['counts'], data['severity_sum'], data['risk_sum'])
+
+    def query(self, filters=None, group_by=None):
+        """
+        Slice the cube and roll it up to the grouped dimensions.
+
+        Args:
+            filters (dict, optional): dimension -> list of labels to keep
+            group_by (list, optional): Dimensions to keep in the result. Defaults to none (grand total).
+
+        Returns:
+            list: One dict per non-empty group with the group's labels, count,
+                severity_sum and mean_risk_score
+
+        Raises:
+            ValueError: If a dimension is unknown
+        """
+        filters = filters or {}
+        group_by = group_by or []
+        unknown = [d for d in list(filters) + list(group_by) if d not in self.dimensions]
+        if unknown:
+            raise ValueError(f'Unknown cube dimensions: {unknown}. Available: {self.dimensions}')
+
+        # Label positions kept along each axis
+        selections = []
+        for dimension in self.dimensions:
+            if dimension in filters:
+                positions = self._positions[dimension]
+                keys = [self._label_key(dimension, label) for label in filters[dimension]]
+                selections.append(np.array([positions[key] for key in keys if key in positions], dtype=np.int64))
+            else:
+                selections.append(np.arange(len(self.labels[dimension])))
+
+        index = np.ix_(*selections)
+        summed_axes = tuple(i for i, dimension in enumerate(self.dimensions) if dimension not in group_by)
+        counts = self.counts[index].sum(axis=summed_axes, dtype=np.int64)
+        severity = self.severity_sum[index].sum(axis=summed_axes)
+        risk = self.risk_sum[index].sum(axis=summed_axes)
+
+        # Remaining axes follow cube order; report groups in the requested order
+        kept = [dimension for dimension in self.dimensions if dimension in group_by]
+        order = [kept.index(dimension) for dimension in group_by]
+        counts, severity, risk = (np.transpose(a, order) for a in (counts, severity, risk))
+
+        cells = list(zip(*np.nonzero(counts))) if counts.ndim else ([()] if counts else [])
+        rows = []
+        for cell in cells:
+            row = {
+                dimension: self.labels[dimension][int(selections[self.dimensions.index(dimension)][i])]
+                for dimension, i in zip(group_by, cell)
+            }
+            count = int(counts[cell])
+            row.update({
+                'count': count,
+                'severity_sum': float(severity[cell]),
+                'mean_risk_score': float(risk[cell] / count)
+            })
+            rows.append(row)
+        return rows
@@ -0,0 +1,262 @@
+"""
+Stateless signed session tokens.
+A token is "<key id>.<claims>.<signature>", where the signature is an
+HMAC-SHA256 over the key id and base64url-encoded JSON claims. Verification
+is pure CPU: the key id selects the current or a rotated-out secret, and
+logouts go into a small revocation set that only keeps unexpired token IDs.
+"""
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import base64
+import secrets
+import hashlib
+import threading
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    SECRET_KEY, DEFAULT_SECRET_KEY, PREVIOUS_SECRET_KEYS, AUTH_TOKEN_TTL_SECONDS,
+    REVOKED_TOKENS_FILE, AUTH_REVOCATION_SYNC_SECONDS, AUTH_SECRET_KEY_FILE, DEPLOYMENT_ENV
+)
+from services.file_lock import FileLock
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def key_id(secret):
+    """Short identifier of a signing secret, embedded in its tokens."""
+    return hashlib.sha256(secret.encode('utf-8')).hexdigest()[:8]
+
+
+def signing_secret(secret=SECRET_KEY, path=AUTH_SECRET_KEY_FILE, environment=DEPLOYMENT_ENV):
+    """
+    Resolve the secret that signs tokens.
+
+    The built-in default SECRET_KEY is public, so it never signs tokens: the
+    cloud deployment refuses to start without a configured key, and local or
+    Docker installs generate a random key once and share it between workers
+    through a file.
+
+    Raises:
+        RuntimeError: If SECRET_KEY is not set in the cloud deployment
+    """
+    if secret != DEFAULT_SECRET_KEY:
+        return secret
+    if environment == 'cloud':
+        raise RuntimeError('SECRET_KEY must be set when DEPLOYMENT_ENV is cloud')
+
+    try:
+        with open(path, 'r') as f:
+            generated = f.read().strip()
+        if generated:
+            return generated
+    except FileNotFoundError:
+        pass
+
+    # Publish the key with a hard link, so concurrent workers all end up with the first complete file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(secrets.token_urlsafe(48))
+    try:
+        os.link(tmp, path)
+        print(f"⚠️ SECRET_KEY is not set; generated a signing key in {path}")
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp)
+    with open(path, 'r') as f:
+        return f.read().strip()
+
+
+class RevocationList:
+    def __init__(self, path, sync_seconds=1.0):
+        self.path = path
+        self.lock_file = f"{os.path.splitext(path)[0]}.lock"
+        self.sync_seconds = sync_seconds
+        self.revoked = {}  # token ID -> expiry
+        self._inode = None
+        self._offset = 0
+        self._lines = 0
+        self._next_sync = 0.0
+        self._lock = threading.Lock()
+
+    def _exclusive(self):
+        """Take an exclusive cross-process lock on the lock file."""
+        return FileLock(self.lock_file)
+
+    def _read(self):
+        """Tail revocations written since the last read (by any worker)."""
+        try:
+            with open(self.path, 'rb') as f:
+                inode = os.fstat(f.fileno()).st_ino
+                if inode != self._inode or os.fstat(f.fileno()).st_size < self._offset:
+                    # New or rewritten file: read it from the start
+                    self.revoked = {}
+                    self._offset = 0
+                    self._lines = 0
+                f.seek(self._offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return
+
+        end = chunk.rfind(b'\n') + 1
+        for line in chunk[:end].splitlines():
+            try:
+                entry = json.loads(line)
+                self.revoked[entry['jti']] = entry['exp']
+            except (json.JSONDecodeError, KeyError, TypeError):
+                continue
+            self._lines += 1
+        self._inode = inode
+        self._offset += end
+
+    def sync(self, force=False):
+        """Pick up other workers' revocations, at most once per sync interval unless forced."""
+        now = time.monotonic()
+        if not force and now < self._next_sync:
+            return
+        with self._lock:
+            self._next_sync = now + self.sync_seconds
+            self._read()
+            expired = [jti for jti, exp in self.revoked.items() if exp <= time.time()]
+            for jti in expired:
+                del self.revoked[jti]
+
+    def contains(self, jti):
+        self.sync()
+        return jti in self.revoked
+
+    def add(self, jti, exp):
+        """Durably revoke a token ID until its expiry."""
+        with self._lock:
+            handle = self._exclusive()
+            try:
+                self._read()
+                with open(self.path, 'ab') as f:
+                    f.write((json.dumps({'jti': jti, 'exp': exp}, separators=(',', ':')) + '\n').encode('utf-8'))
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._read()
+
+                # Rewrite the file without expired entries once they dominate it
+                if self._lines > 1000 and self._lines > 2 * len(self.revoked):
+                    self._rewrite()
+            finally:
+                handle.close()
+
+    def _rewrite(self):
+        now = time.time()
+        live = {jti: exp for jti, exp in self.revoked.items() if exp > now}
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'wb') as f:
+            for jti, exp in live.items():
+                f.write((json.dumps({'jti': jti, 'exp': exp}, separators=(',', ':')) + '\n').encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._inode = None
+        self._read()
+
+
+class TokenService:
+    def __init__(self, secret=SECRET_KEY, previous_secrets=PREVIOUS_SECRET_KEYS,
+                 ttl_seconds=AUTH_TOKEN_TTL_SECONDS, revocations=None):
+        secret = signing_secret(secret)
+        self.ttl_seconds = ttl_seconds
+        self.current_kid = key_id(secret)
+        # Tokens signed with rotated-out secrets stay valid until they expire
+        self.keys = {key_id(s): s.encode('utf-8') for s in previous_secrets if s != DEFAULT_SECRET_KEY}
+        self.keys[self.current_kid] = secret.encode('utf-8')
+        self.revocations = revocations or RevocationList(REVOKED_TOKENS_FILE, AUTH_REVOCATION_SYNC_SECONDS)
+
+    def _sign(self, kid, payload):
+        return _b64encode(hmac.new(self.keys[kid], f"{kid}.{payload}".encode('ascii'), hashlib.sha256).digest())
+
+    def issue(self, user):
+        """
+        Issue a signed token for a user.
+
+        Args:
+            user (dict): User with email and name
+
+        Returns:
+            str: Token
+        """
+        now = int(time.time())
+        claims = {
+            'sub': user['email'],
+            'name': user.get('name', ''),
+            'iat': now,
+            'exp': now + self.ttl_seconds,
+            'jti': uuid.uuid4().hex[:16]
+        }
+        payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+        return f"{self.current_kid}.{payload}.{self._sign(self.current_kid, payload)}"
+
+    def decode(self, token):
+        """
+        Check a token's signature and expiry without consulting revocations.
+
+        Returns:
+            dict: Claims, or None if the token is malformed, forged or expired
+        """
+        # Tokens are base64url and hex only; anything else cannot be signed or compared
+        parts = token.split('.') if isinstance(token, str) and token.isascii() else ()
+        if len(parts) != 3 or parts[0] not in self.keys:
+            return None
+        kid, payload, signature = parts
+        if not hmac.compare_digest(signature, self._sign(kid, payload)):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+        if claims.get('exp', 0) <= time.time():
+            return None
+        return claims
+
+    def verify(self, token):
+        """
+        Verify a token.
+
+        Returns:
+            dict: Claims (sub, name, iat, exp, jti), or None if the token is not valid
+        """
+        claims = self.decode(token)
+        if claims is None or self.revocations.contains(claims.get('jti')):
+            return None
+        return claims
+
+    def revoke(self, token):
+        """
+        Revoke a token until it expires.
+
+        Returns:
+            bool: True if the token was valid and is now revoked
+        """
+        claims = self.decode(token)
+        if claims is None:
+            return False
+        self.revocations.add(claims['jti'], claims['exp'])
+        return True
+
+    @staticmethod
+    def is_signed(token):
+        """Whether a token has the signed format (as opposed to a legacy random token)."""
+        return isinstance(token, str) and token.count('.') == 2
+
+# Singleton instance
+token_service = TokenService()
@@ -0,0 +1,103 @@
+"""
+Bitmap indexes over categorical accident attributes.
+Every value of an indexed column has a bitset with one bit per row, packed
+eight rows to a byte. Filters combine bitsets with bitwise AND/OR, counts
+use a popcount over the packed bytes, and row positions are only unpacked
+when they are asked for.
+"""
+import numpy as np
+import pandas as pd
+
+BITMAP_COLUMNS = ['weather', 'road_type', 'road_condition', 'lighting', 'state', 'city', 'severity', 'vehicle_type']
+
+
+class BitmapIndex:
+    def __init__(self, df, columns=BITMAP_COLUMNS):
+        self.size = len(df)
+        self.n_bytes = (self.size + 7) // 8
+        self.bitmaps = {}  # column -> {value: packed bitset}
+
+        for column in columns:
+            if column not in df:
+                continue
+            codes, uniques = pd.factorize(df[column])
+            self.bitmaps[column] = {value: np.packbits(codes == i) for i, value in enumerate(uniques)}
+
+    def _empty(self):
+        return np.zeros(self.n_bytes, dtype=np.uint8)
+
+    def _full(self):
+        bits = np.full(self.n_bytes, 0xFF, dtype=np.uint8)
+        if self.size % 8:
+            # Clear the padding bits past the last row
+            bits[-1] = (0xFF << (8 - self.size % 8)) & 0xFF
+        return bits
+
+    def bitmap(self, column, values):
+        """
+        Bitset of rows whose column holds any of the values.
+
+        Raises:
+            ValueError: If the column is not indexed
+        """
+        if column not in self.bitmaps:
+            raise ValueError(f'Column is not indexed: {column}. Indexed columns: {list(self.bitmaps)}')
+        bitmaps = self.bitmaps[column]
+        result = self._empty()
+        for value in values:
+            bits = bitmaps.get(value)
+            if bits is not None:
+                result |= bits
+        return result
+
+    def filter(self, conditions, combine='and'):
+        """
+        Combine per-column conditions into one bitset.
+
+        Values within a column are ORed; columns are combined with combine.
+
+        Args:
+            conditions (dict): column -> list of accepted values
+            combine (str, optional): 'and' or 'or'. Defaults to 'and'.
+
+        Returns:
+            np.ndarray: Packed bitset of matching rows
+        """
+        if combine not in ('and', 'or'):
+            raise ValueError("combine must be 'and' or 'or'")
+        if not conditions:
+            return self._full()
+
+        result = self._full() if combine == 'and' else self._empty()
+        for column, values in conditions.items():
+            bits = self.bitmap(column, values)
+            if combine == 'and':
+                result &= bits
+            else:
+                result |= bits
+        return result
+
+    def group_counts(self, column, bits):
+        """
+        Count the rows of a bitset for every value of a column.
+
+        Returns:
+            dict: value -> count, for values with at least one row
+        """
+        if column not in self.bitmaps:
+            raise ValueError(f'Column is not indexed: {column}. Indexed columns: {list(self.bitmaps)}')
+        counts = {}
+        for value, value_bits in self.bitmaps[column].items():
+            count = self.count(value_bits & bits)
+            if count:
+                counts[value] = count
+        return counts
+
+    @staticmethod
+    def count(bits):
+        """Number of rows set in a bitset."""
+        return int(np.bitwise_count(bits).sum())
+
+    def positions(self, bits):
+        """Row positions set in a bitset, in ascending order."""
+        return np.flatnonzero(np.unpackbits(bits, count=self.size))
@@ -0,0 +1,157 @@
+"""
+Binary columnar storage for the processed feature data.
+Each column is a typed .npy file; text columns are stored as integer codes
+with their categories in a JSON manifest. Loading memory-maps the files, so
+it costs a few system calls instead of parsing text, and worker processes
+share the same page-cache pages. The manifest is replaced atomically and
+carries a content version, so readers always see a complete dataset.
+"""
+import os
+import sys
+import json
+import uuid
+import hashlib
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PROCESSED_DATA_DIR, COLUMNAR_FEATURES_DIR
+
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+
+
+def manifest_path(directory=COLUMNAR_FEATURES_DIR):
+    return os.path.join(directory, MANIFEST_FILE)
+
+
+def _code_dtype(n_categories):
+    """Smallest signed integer type holding category codes (and -1 for missing)."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def save_columnar(df, directory=COLUMNAR_FEATURES_DIR):
+    """
+    Save a DataFrame as per-column .npy files plus a JSON manifest.
+
+    Args:
+        df (pd.DataFrame): Data to save
+        directory (str, optional): Target directory. Defaults to COLUMNAR_FEATURES_DIR.
+
+    Returns:
+        dict: The written manifest
+    """
+    os.makedirs(directory, exist_ok=True)
+    # Fresh file names per write, so readers of the previous manifest keep a consistent set
+    token = uuid.uuid4().hex[:8]
+    digest = hashlib.sha256()
+    columns = []
+
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        entry = {'name': str(name), 'file': f'{i:04d}_{token}.npy'}
+        if series.dtype.kind in 'biuf':
+            values = series.to_numpy()
+            entry['kind'] = 'numeric'
+        elif series.dtype.kind == 'M':
+            values = series.to_numpy(dtype='datetime64[ns]').view(np.int64)
+            entry['kind'] = 'datetime'
+        else:
+            codes, categories = pd.factorize(series, sort=True)
+            values = codes.astype(_code_dtype(len(categories)))
+            entry['kind'] = 'categorical'
+            entry['categories'] = [str(category) for category in categories]
+            digest.update(json.dumps(entry['categories']).encode('utf-8'))
+        entry['dtype'] = str(values.dtype)
+
+        values = np.ascontiguousarray(values)
+        np.save(os.path.join(directory, entry['file']), values)
+        digest.update(str(name).encode('utf-8'))
+        digest.update(values.tobytes())
+        columns.append(entry)
+
+    manifest = {
+        'format': FORMAT_VERSION,
+        'rows': len(df),
+        'version': digest.hexdigest()[:16],
+        'columns': columns
+    }
+    tmp = f"{manifest_path(directory)}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, manifest_path(directory))
+
+    # Drop column files of earlier versions (processes that mapped them keep their pages)
+    current = {entry['file'] for entry in columns}
+    for filename in os.listdir(directory):
+        if filename.endswith('.npy') and filename not in current:
+            os.remove(os.path.join(directory, filename))
+
+    return manifest
+
+
+def load_columnar(directory=COLUMNAR_FEATURES_DIR, columns=None, mmap=True):
+    """
+    Load a dataset saved with save_columnar.
+
+    Args:
+        directory (str, optional): Dataset directory. Defaults to COLUMNAR_FEATURES_DIR.
+        columns (list, optional): Columns to load. Defaults to all columns.
+        mmap (bool, optional): Memory-map numeric data instead of reading it. Defaults to True.
+
+    Returns:
+        tuple: (DataFrame, manifest)
+
+    Raises:
+        FileNotFoundError: If there is no columnar dataset in the directory
+    """
+    with open(manifest_path(directory), 'r') as f:
+        manifest = json.load(f)
+
+    wanted = set(columns) if columns is not None else None
+    data = {}
+    for entry in manifest['columns']:
+        if wanted is not None and entry['name'] not in wanted:
+            continue
+        values = np.load(os.path.join(directory, entry['file']), mmap_mode='r' if mmap else None)
+        if entry['kind'] == 'categorical':
+            data[entry['name']] = pd.Categorical.from_codes(values, categories=entry['categories'])
+        elif entry['kind'] == 'datetime':
+            data[entry['name']] = values.view('datetime64[ns]')
+        else:
+            data[entry['name']] = values
+
+    # copy=False keeps the memory-mapped arrays as the frame's column storage
+    return pd.DataFrame(data, copy=False), manifest
+
+
+def load_features(columns=None):
+    """
+    Load the processed features, preferring the columnar format over the CSV export.
+
+    Returns:
+        pd.DataFrame: Features, or an empty DataFrame if neither format exists
+    """
+    try:
+        return load_columnar(columns=columns)[0]
+    except FileNotFoundError:
+        pass
+
+    csv_path = os.path.join(PROCESSED_DATA_DIR, 'comprehensive_features.csv')
+    if os.path.exists(csv_path):
+        return pd.read_csv(csv_path, usecols=columns)
+    return pd.DataFrame()
+
+
+if __name__ == '__main__':
+    # Convert an existing CSV export to the columnar format
+    csv_path = os.path.join(PROCESSED_DATA_DIR, 'comprehensive_features.csv')
+    manifest = save_columnar(pd.read_csv(csv_path))
+    print(f"✅ Saved {manifest['rows']} rows x {len(manifest['columns'])} columns to {COLUMNAR_FEATURES_DIR} (version {manifest['version']})")
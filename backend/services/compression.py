@@ -0,0 +1,181 @@
+"""
+Response body compression.
+Bodies are encoded with brotli when the package is installed and the client
+accepts it, and with gzip otherwise. Bodies that are identified by a strong
+ETag (static files, responses tied to a dataset version) never change for
+that tag, so each encoded variant is produced once at a higher level and
+kept in a size-bounded LRU cache.
+"""
+import os
+import sys
+import zlib
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import COMPRESSION_LEVELS, COMPRESSION_CACHED_LEVELS, COMPRESSION_CACHE_BYTES
+
+# Preferred first
+ENCODINGS = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/javascript', 'application/x-javascript',
+    'application/x-ndjson', 'application/xml', 'image/svg+xml'
+}
+
+
+def is_compressible(mimetype):
+    """Whether a body of this type is worth compressing (text-like and not a live event stream)."""
+    if not mimetype or mimetype == 'text/event-stream':
+        return False
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def choose_encoding(accept_encodings):
+    """
+    Pick the content coding for a request.
+
+    Args:
+        accept_encodings: Parsed Accept-Encoding header (anything with a quality(name) method)
+
+    Returns:
+        str: 'br' or 'gzip', or None to send the body unencoded
+    """
+    best, best_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, level=None):
+    """
+    Encode a whole body.
+
+    Args:
+        data (bytes): Body
+        encoding (str): 'br' or 'gzip'
+        level (int, optional): Compression level. Defaults to COMPRESSION_LEVELS[encoding].
+
+    Returns:
+        bytes: Encoded body
+    """
+    level = COMPRESSION_LEVELS[encoding] if level is None else level
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding, level=None):
+    """
+    Encode a streamed body chunk by chunk.
+
+    Each chunk is flushed, so the client receives data as soon as it is
+    produced instead of when the compressor's window fills.
+
+    Args:
+        chunks (iterable): Body chunks (bytes or str)
+        encoding (str): 'br' or 'gzip'
+        level (int, optional): Compression level. Defaults to COMPRESSION_LEVELS[encoding].
+
+    Yields:
+        bytes: Encoded chunks
+    """
+    level = COMPRESSION_LEVELS[encoding] if level is None else level
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        process, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                yield process(chunk) + flush()
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+class CompressionCache:
+    def __init__(self, max_bytes=COMPRESSION_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # (etag, encoding) -> encoded body
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, etag, encoding):
+        """Look up the encoded variant of a body, or None."""
+        with self._lock:
+            body = self.entries.get((etag, encoding))
+            if body is None:
+                self.misses += 1
+            else:
+                self.entries.move_to_end((etag, encoding))
+                self.hits += 1
+            return body
+
+    def put(self, etag, encoding, body):
+        """Store an encoded variant, evicting the least recently used ones."""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self.entries.pop((etag, encoding), None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[(etag, encoding)] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def compress(self, etag, encoding, data):
+        """
+        Get the encoded variant of the body identified by a strong ETag, encoding it on a miss.
+
+        Args:
+            etag (str): Strong ETag of the unencoded body
+            encoding (str): 'br' or 'gzip'
+            data (bytes): Unencoded body
+
+        Returns:
+            bytes: Encoded body
+        """
+        body = self.get(etag, encoding)
+        if body is None:
+            body = compress(data, encoding, COMPRESSION_CACHED_LEVELS[encoding])
+            self.put(etag, encoding, body)
+        return body
+
+    def stats(self):
+        """Return cache size and hit ratio."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'encodings': ENCODINGS,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
+
+# Singleton instance
+compression_cache = CompressionCache()
@@ -0,0 +1,141 @@
+"""
+Streaming exports of the hotspots dataset.
+Rows are encoded in fixed-size batches straight from the column arrays, so
+memory stays flat regardless of the export size and the first bytes go out
+as soon as the first batch is encoded. The same path produces NDJSON, a JSON
+array, CSV and a columnar .npz archive.
+"""
+import io
+import csv
+import json
+import zipfile
+import numpy as np
+import pandas as pd
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'json': ('application/json', 'json'),
+    'csv': ('text/csv', 'csv'),
+    'npz': ('application/zip', 'npz')
+}
+
+
+def _column_values(values):
+    """Plain Python values of a column slice, with missing values as None."""
+    values = np.asarray(values, dtype=object) if isinstance(values, pd.Categorical) else np.asarray(values)
+    if values.dtype.kind == 'f':
+        missing = np.isnan(values)
+        if missing.any():
+            return [None if is_missing else value for value, is_missing in zip(values.tolist(), missing.tolist())]
+    elif values.dtype.kind == 'O':
+        return [None if value is None or value != value else value for value in values.tolist()]
+    return values.tolist()
+
+
+def iter_batches(df, positions, fields, batch_size):
+    """
+    Yield the selected rows as lists of column values, one batch at a time.
+
+    Args:
+        df (pd.DataFrame): Dataset
+        positions (np.ndarray): Row positions to export, in order
+        fields (list): Columns to export
+        batch_size (int): Rows per batch
+
+    Yields:
+        list: One list of values per field
+    """
+    columns = [df[field].array if isinstance(df[field].dtype, pd.CategoricalDtype) else df[field].to_numpy()
+               for field in fields]
+    for start in range(0, len(positions), batch_size):
+        batch = positions[start:start + batch_size]
+        yield [_column_values(column[batch]) for column in columns]
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only stream that collects bytes for a generator to yield."""
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_export(df, positions, fields, fmt, dumps=json.dumps, batch_size=2000):
+    """
+    Encode the selected rows in the given format.
+
+    Args:
+        df (pd.DataFrame): Dataset
+        positions (np.ndarray): Row positions to export, in order
+        fields (list): Columns to export
+        fmt (str): ndjson, json, csv or npz
+        dumps (callable, optional): JSON encoder for one row. Defaults to json.dumps.
+        batch_size (int, optional): Rows per batch. Defaults to 2000.
+
+    Yields:
+        bytes: Encoded chunks
+    """
+    if fmt == 'npz':
+        yield from _stream_npz(df, positions, fields)
+        return
+
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for columns in iter_batches(df, positions, fields, batch_size):
+            writer.writerows(zip(*columns))
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+        return
+
+    separator = '\n' if fmt == 'ndjson' else ','
+    if fmt == 'json':
+        yield b'['
+    first = True
+    for columns in iter_batches(df, positions, fields, batch_size):
+        rows = separator.join(dumps(dict(zip(fields, row))) for row in zip(*columns))
+        if fmt == 'ndjson':
+            rows += '\n'
+        elif not first:
+            rows = ',' + rows
+        first = False
+        yield rows.encode('utf-8')
+    if fmt == 'json':
+        yield b']'
+
+
+def _stream_npz(df, positions, fields):
+    """One .npy member per column (text columns as codes plus a categories member)."""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for field in fields:
+            column = df[field]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                with archive.open(f'{field}.categories.npy', 'w', force_zip64=True) as member:
+                    np.save(member, np.asarray(column.cat.categories, dtype=str))
+                values = column.cat.codes.to_numpy()[positions]
+            elif column.dtype.kind in 'biufM':
+                values = column.to_numpy()[positions]
+            else:
+                codes, categories = pd.factorize(column, sort=True)
+                with archive.open(f'{field}.categories.npy', 'w', force_zip64=True) as member:
+                    np.save(member, np.asarray(categories, dtype=str))
+                values = codes[positions]
+            with archive.open(f'{field}.npy', 'w', force_zip64=True) as member:
+                np.save(member, values)
+            yield sink.drain()
+    yield sink.drain()
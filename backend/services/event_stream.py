@@ -0,0 +1,73 @@
+"""
+In-memory event stream for live report and risk updates.
+Events are kept in a fixed-size ring buffer with sequence numbers; each
+connection only holds its last-seen sequence, so slow clients cost no
+memory and are told to resync when they fall behind the buffer.
+"""
+import os
+import sys
+import threading
+import itertools
+from collections import deque
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import STREAM_BUFFER_SIZE
+
+
+class EventStream:
+    def __init__(self, capacity=STREAM_BUFFER_SIZE):
+        self.events = deque(maxlen=capacity)
+        self.last_seq = 0
+        self._condition = threading.Condition()
+
+    def publish(self, event_type, lat, lon, data):
+        """
+        Publish an event located at a point.
+
+        Args:
+            event_type (str): SSE event name
+            lat (float): Latitude used for bounding-box filtering
+            lon (float): Longitude used for bounding-box filtering
+            data (dict): Event payload
+
+        Returns:
+            int: Sequence number of the event
+        """
+        with self._condition:
+            self.last_seq += 1
+            self.events.append((self.last_seq, event_type, lat, lon, data))
+            self._condition.notify_all()
+            return self.last_seq
+
+    def read(self, after_seq, timeout, limit):
+        """
+        Read events published after a sequence number, waiting up to timeout for new ones.
+
+        Args:
+            after_seq (int): Last sequence number the reader has seen
+            timeout (float): Seconds to wait when there is nothing new
+            limit (int): Maximum number of events to return
+
+        Returns:
+            tuple: (events, dropped) where dropped is True if events after
+                after_seq have already been evicted from the buffer, or if
+                after_seq is ahead of this stream (sequence numbers are per
+                process, so it came from before a restart or another worker)
+        """
+        with self._condition:
+            if after_seq > self.last_seq:
+                return [], True
+            if self.last_seq <= after_seq:
+                self._condition.wait(timeout)
+            if not self.events or self.last_seq <= after_seq:
+                return [], False
+
+            oldest = self.events[0][0]
+            dropped = after_seq < oldest - 1
+            start = max(0, after_seq - oldest + 1)
+            return list(itertools.islice(self.events, start, start + limit)), dropped
+
+# Singleton instance
+event_stream = EventStream()
@@ -0,0 +1,53 @@
+"""
+Cross-process file locks for state shared by worker processes.
+Uses flock on POSIX. Windows (local development) only has exclusive
+byte-range locks, so shared locks are taken exclusively there. Where
+neither is available the lock only opens the file.
+"""
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+class FileLock:
+    def __init__(self, path, shared=False):
+        """
+        Open a lock file and block until the lock is held.
+
+        Args:
+            path (str): Lock file, created if missing
+            shared (bool, optional): Take a shared instead of an exclusive lock. Defaults to False.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.handle = open(path, 'a+')
+        if fcntl is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            self.handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self.handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after about 10 seconds; keep waiting
+
+    def close(self):
+        """Release the lock."""
+        if fcntl is None and msvcrt is not None:
+            self.handle.seek(0)
+            msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+        self.handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,67 @@
+"""
+Serving-side access to the hotspot aggregation cube.
+The cube written by the feature engineering pipeline is loaded once and
+reloaded when the file changes. Without a cube file, one is built from the
+cached hotspots dataset and kept for that dataset version.
+"""
+import os
+import sys
+import threading
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import HOTSPOT_CUBE_PATH
+from services.aggregation_cube import AggregationCube
+from services.hotspot_dataset import hotspot_dataset
+
+
+class HotspotCube:
+    def __init__(self, path=HOTSPOT_CUBE_PATH):
+        self.path = path
+        self.cube = None
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        """
+        Get the current cube.
+
+        Returns:
+            AggregationCube: The cube, or None if there is neither a cube file nor a dataset
+        """
+        try:
+            stat = os.stat(self.path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            snapshot = hotspot_dataset.current()
+            if snapshot is None:
+                return None
+            return snapshot.cached('aggregation_cube', lambda: AggregationCube.build(snapshot.df))
+
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    self.cube = AggregationCube.load(self.path)
+                    self._signature = signature
+                    print(f"✅ Loaded aggregation cube {self.cube.counts.shape} from {self.path}")
+        return self.cube
+
+    def version(self):
+        """
+        Identify the cube current() returns, e.g. for HTTP validators.
+
+        Returns:
+            tuple: (version, last_modified), or None if there is neither a cube file nor a dataset
+        """
+        try:
+            stat = os.stat(self.path)
+            return f"file-{stat.st_mtime_ns:x}-{stat.st_size:x}", stat.st_mtime
+        except FileNotFoundError:
+            snapshot = hotspot_dataset.current()
+            if snapshot is None:
+                return None
+            return f"dataset-{snapshot.version}", snapshot.mtime
+
+# Singleton instance
+hotspot_cube = HotspotCube()
@@ -0,0 +1,156 @@
+"""
+Process-wide cache of the processed hotspots dataset.
+The columnar dataset (or, without one, the CSV export) is loaded once; each
+request only stats the manifest or file, and the data is reloaded when its
+mtime changes and its content version differs.
+Everything derived from one version of the data (summary statistics,
+serialized response bodies, indexes) is memoized on that version's snapshot,
+so it is dropped together with the rows on reload.
+"""
+import os
+import sys
+import hashlib
+import threading
+import pandas as pd
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PROCESSED_DATA_DIR, COLUMNAR_FEATURES_DIR
+from services.bitmap_index import BitmapIndex
+from services.columnar_store import load_columnar, manifest_path
+
+
+def file_hash(path):
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_dtypes(df):
+    """
+    Column dtypes as the CSV export reads them.
+
+    The columnar store loads text columns as categoricals; they are reported
+    with their categories' dtype, so the summary does not depend on the format.
+    """
+    return {
+        str(column): str(dtype.categories.dtype if isinstance(dtype, pd.CategoricalDtype) else dtype)
+        for column, dtype in df.dtypes.items()
+    }
+
+
+class DatasetSnapshot:
+    def __init__(self, df, content_hash, mtime):
+        self.df = df
+        self.version = content_hash[:16]
+        self.mtime = mtime
+        self.summary = {
+            'total_records': len(df),
+            'columns': list(df.columns),
+            'data_types': source_dtypes(df),
+            'numeric_summary': df.describe().to_dict() if len(df) > 0 else {}
+        }
+        self.bitmap_index = BitmapIndex(df)
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def cached(self, key, build):
+        """
+        Memoize a value derived from this version of the data.
+
+        Args:
+            key: Cache key
+            build (callable): Builds the value on first use
+
+        Returns:
+            The cached value
+        """
+        value = self._derived.get(key)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(key)
+                if value is None:
+                    value = build()
+                    self._derived[key] = value
+        return value
+
+
+class HotspotDataset:
+    def __init__(self, path=None, columnar_dir=COLUMNAR_FEATURES_DIR):
+        self.path = path or os.path.join(PROCESSED_DATA_DIR, 'comprehensive_features.csv')
+        self.columnar_dir = columnar_dir
+        self.snapshot = None
+        self.loads = 0
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _stat(self):
+        """Signature of the data source: the columnar manifest if there is one, else the CSV."""
+        for source, path in (('columnar', manifest_path(self.columnar_dir)), ('csv', self.path)):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            return (source, stat.st_mtime_ns, stat.st_size)
+        return None
+
+    def current(self):
+        """
+        Get the current dataset snapshot, reloading it if the file changed.
+
+        Returns:
+            DatasetSnapshot: Current snapshot, or None if the data file does not exist
+        """
+        signature = self._stat()
+        if signature == self._signature:
+            return self.snapshot
+
+        with self._lock:
+            if signature != self._signature:
+                self._reload(signature)
+        return self.snapshot
+
+    def _reload(self, signature):
+        if signature is None:
+            self.snapshot = None
+            self._signature = None
+            return
+
+        if signature[0] == 'columnar':
+            try:
+                df, manifest = load_columnar(self.columnar_dir)
+            except FileNotFoundError:
+                # Replaced while loading; the next request picks up the new version
+                return
+            content_hash = manifest['version']
+        else:
+            content_hash = file_hash(self.path)
+            df = None
+
+        if self.snapshot is not None and self.snapshot.version == content_hash[:16]:
+            # Touched but unchanged: keep the loaded data and everything derived from it
+            self._signature = signature
+            return
+
+        if df is None:
+            df = pd.read_csv(self.path)
+        self.snapshot = DatasetSnapshot(df, content_hash, signature[1] / 1e9)
+        self._signature = signature
+        self.loads += 1
+        print(f"✅ Loaded hotspots dataset ({len(df)} rows, version {self.snapshot.version})")
+
+    def stats(self):
+        """Return the loaded version and reload count."""
+        snapshot = self.snapshot
+        return {
+            'version': snapshot.version if snapshot else None,
+            'rows': len(snapshot.df) if snapshot else 0,
+            'loads': self.loads
+        }
+
+# Singleton instance
+hotspot_dataset = HotspotDataset()
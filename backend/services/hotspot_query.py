@@ -0,0 +1,126 @@
+"""
+Indexed queries over the cached hotspots dataset.
+Categorical filters use the snapshot's bitmap index (shared with
+/hotspots/filter), and numeric columns get a sorted order per dataset
+version. Filters become bitset ANDs, range lookups and intersections of
+sorted position arrays, so pages are cut from the matching rows rather
+than from a scan of the dataset.
+"""
+import base64
+import numpy as np
+import pandas as pd
+
+# Columns filtered by (one or more) exact values; each must be in BITMAP_COLUMNS
+EQUALITY_FILTERS = ['state', 'city', 'weather', 'severity']
+# Numeric columns filtered by exact value or by <column>_min / <column>_max
+RANGE_FILTERS = ['hour', 'month']
+
+
+class HotspotQueryIndex:
+    def __init__(self, df, version, bitmap_index):
+        self.df = df
+        self.version = version
+        self.size = len(df)
+        self.bitmap_index = bitmap_index
+
+        self.sorted = {}
+        for column in RANGE_FILTERS:
+            if column not in df:
+                continue
+            values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+            order = np.argsort(values, kind='stable')  # NaNs sort last
+            self.sorted[column] = (values[order], order, int(np.count_nonzero(~np.isnan(values))))
+
+    def _equal(self, equals):
+        if any(column not in self.bitmap_index.bitmaps for column in equals):
+            return np.empty(0, dtype=np.int64)  # the column is not in the dataset
+        return self.bitmap_index.positions(self.bitmap_index.filter(equals))
+
+    def _range(self, column, low, high):
+        sorted_values, order, count = self.sorted[column]
+        start = np.searchsorted(sorted_values[:count], low, 'left') if low is not None else 0
+        end = np.searchsorted(sorted_values[:count], high, 'right') if high is not None else count
+        return np.sort(order[start:end])
+
+    def positions(self, equals=None, ranges=None):
+        """
+        Find the rows matching all filters.
+
+        Args:
+            equals (dict, optional): column -> list of accepted values
+            ranges (dict, optional): column -> (low, high), inclusive; either bound may be None
+
+        Returns:
+            np.ndarray: Sorted row positions
+        """
+        matches = [self._equal(equals)] if equals else []
+        for column, (low, high) in (ranges or {}).items():
+            matches.append(self._range(column, low, high))
+
+        if not matches:
+            return np.arange(self.size)
+
+        # Intersect starting from the most selective filter
+        matches.sort(key=len)
+        result = matches[0]
+        for positions in matches[1:]:
+            if len(result) == 0:
+                break
+            result = np.intersect1d(result, positions, assume_unique=True)
+        return result
+
+    def encode_cursor(self, position):
+        """Encode the last returned row position as an opaque cursor tied to this dataset version."""
+        return base64.urlsafe_b64encode(f"{self.version}:{position}".encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """
+        Decode a cursor produced by encode_cursor.
+
+        Raises:
+            ValueError: If the cursor is malformed or belongs to an older dataset version
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            version, position = raw.split(':', 1)
+            position = int(position)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f'Invalid cursor: {cursor}') from e
+        if version != self.version:
+            raise ValueError('Cursor is from an older version of the dataset; restart from the first page')
+        return position
+
+    def query(self, equals=None, ranges=None, fields=None, limit=1000, cursor=None):
+        """
+        Run a filtered, projected and paginated query.
+
+        Args:
+            equals (dict, optional): column -> list of accepted values
+            ranges (dict, optional): column -> (low, high)
+            fields (list, optional): Columns to return. Defaults to all columns.
+            limit (int, optional): Maximum number of rows. Defaults to 1000.
+            cursor (str, optional): Return rows after this cursor.
+
+        Returns:
+            tuple: (records, next_cursor, total) where total counts all matching rows
+                and next_cursor is None on the last page
+
+        Raises:
+            ValueError: If a field is unknown or the cursor is invalid
+        """
+        if fields:
+            unknown = [field for field in fields if field not in self.df.columns]
+            if unknown:
+                raise ValueError(f'Unknown fields: {unknown}')
+
+        positions = self.positions(equals, ranges)
+        start = np.searchsorted(positions, self.decode_cursor(cursor), 'right') if cursor else 0
+        page = positions[start:start + limit]
+
+        # Select rows and columns in one step so only the page is copied
+        columns = [self.df.columns.get_loc(field) for field in fields] if fields else slice(None)
+        records = self.df.iloc[page, columns].to_dict('records')
+
+        more = start + limit < len(positions)
+        next_cursor = self.encode_cursor(int(page[-1])) if more and len(page) else None
+        return records, next_cursor, len(positions)
@@ -5,12 +5,91 @@ Uses Google Maps API to convert addresses to coordinates.
 import requests
 import json
 import os
-from config import GOOGLE_MAPS_API_KEY
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import GOOGLE_MAPS_API_KEY, GEOCODE_CACHE_SIZE, GEOCODE_MAX_CONCURRENCY
+from services.spatial_resolver import STATE_CENTROIDS, CITY_CENTROIDS
+
+COORDINATE_PATTERN = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$')
+
+# Warnings already printed by this process; batch geocoding would otherwise
+# repeat the same dummy-geocoding warning for every address
+_printed_warnings = set()
+_printed_warnings_lock = threading.Lock()
+
+
+def _warn_once(message):
+    """Print a warning the first time it is issued in this process."""
+    with _printed_warnings_lock:
+        if message in _printed_warnings:
+            return
+        _printed_warnings.add(message)
+    print(message)
+
 
 class MapsService:
     def __init__(self):
         self.api_key = GOOGLE_MAPS_API_KEY
         self.base_url = 'https://maps.googleapis.com/maps/api/geocode/json'
+        self.cache = OrderedDict()
+        self.cache_size = GEOCODE_CACHE_SIZE
+        self.max_concurrency = GEOCODE_MAX_CONCURRENCY
+        self._cache_lock = threading.Lock()
+        self.gazetteer = self._build_gazetteer()
+
+    def _build_gazetteer(self):
+        """Build a lookup of known city and state names for local resolution."""
+        gazetteer = {}
+        for state, (lat, lon) in STATE_CENTROIDS.items():
+            gazetteer[state.lower()] = {'lat': lat, 'lon': lon, 'formatted_address': f"{state}, India"}
+        for city, (lat, lon, state) in CITY_CENTROIDS.items():
+            place = {'lat': lat, 'lon': lon, 'formatted_address': f"{city}, {state}, India"}
+            gazetteer[city.lower()] = place
+            gazetteer[f"{city}, {state}".lower()] = place
+        return gazetteer
+
+    def _normalize_address(self, address):
+        """Normalize an address for caching and deduplication."""
+        normalized = re.sub(r'\s+', ' ', str(address)).strip().lower()
+        normalized = re.sub(r'\s*,\s*', ', ', normalized).strip(' ,.')
+        if normalized.endswith(', india'):
+            normalized = normalized[:-len(', india')]
+        return normalized
+
+    def _resolve_locally(self, normalized):
+        """
+        Resolve an address without an API call.
+
+        Handles literal "lat, lon" strings and exact matches of known
+        city or state names.
+        """
+        match = COORDINATE_PATTERN.match(normalized)
+        if match:
+            lat, lon = float(match.group(1)), float(match.group(2))
+            if -90 <= lat <= 90 and -180 <= lon <= 180:
+                return {'lat': lat, 'lon': lon}
+        place = self.gazetteer.get(normalized)
+        return dict(place) if place else None
+
+    def _is_cacheable(self, location):
+        """Only real API results are cached; dummy fallbacks carry no address."""
+        return bool(location) and 'formatted_address' in location
+
+    def _cache_get(self, key):
+        with self._cache_lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+        return None
+
+    def _cache_put(self, key, location):
+        with self._cache_lock:
+            self.cache[key] = location
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
 
     def geocode(self, address):
         """
@@ -22,8 +101,58 @@ class MapsService:
         Returns:
             dict: {'lat': float, 'lon': float} or None if failed
         """
+        key = self._normalize_address(address)
+        location = self._cache_get(key) or self._resolve_locally(key)
+        if location:
+            return dict(location)
+
+        location = self._geocode_remote(address)
+        if self._is_cacheable(location):
+            self._cache_put(key, location)
+        return location
+
+    def geocode_many(self, addresses):
+        """
+        Geocode a batch of addresses.
+
+        Addresses are deduplicated after normalization, served from the cache
+        or resolved locally where possible, and the remainder are geocoded
+        concurrently with at most ``max_concurrency`` requests in flight.
+
+        Args:
+            addresses (list): Addresses to geocode
+
+        Returns:
+            list: {'lat': float, 'lon': float} or None for each address, in input order
+        """
+        keys = [self._normalize_address(address) for address in addresses]
+        resolved = {}
+        pending = {}
+
+        for address, key in zip(addresses, keys):
+            if key in resolved or key in pending:
+                continue
+            location = self._cache_get(key) or self._resolve_locally(key)
+            if location:
+                resolved[key] = location
+            else:
+                pending[key] = address
+
+        if pending:
+            workers = max(1, min(self.max_concurrency, len(pending)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(self._geocode_remote, pending.values())
+                for key, location in zip(pending.keys(), results):
+                    resolved[key] = location
+                    if self._is_cacheable(location):
+                        self._cache_put(key, location)
+
+        return [dict(resolved[key]) if resolved[key] else None for key in keys]
+
+    def _geocode_remote(self, address):
+        """Geocode an address through the Google Maps API."""
         if not self.api_key or self.api_key == 'your_google_maps_api_key_here':
-            print("⚠️ Google Maps API key not configured, using dummy geocoding")
+            _warn_once("⚠️ Google Maps API key not configured, using dummy geocoding")
             return self._dummy_geocode(address)
 
         try:
@@ -38,10 +167,11 @@ class MapsService:
             data = response.json()
 
             if data['status'] == 'OK' and data['results']:
-                location = data['results'][0]['geometry']['location']
+                result = data['results'][0]
                 return {
-                    'lat': location['lat'],
-                    'lon': location['lng']
+                    'lat': result['geometry']['location']['lat'],
+                    'lon': result['geometry']['location']['lng'],
+                    'formatted_address': result.get('formatted_address', address)
                 }
             else:
                 print(f"❌ Geocoding failed for '{address}': {data.get('status', 'Unknown error')}")
@@ -57,7 +187,7 @@ class MapsService:
     def _dummy_geocode(self, address):
         """Return dummy coordinates for testing when API is not available."""
         # Return coordinates for a default location (e.g., center of India)
-        print(f"📍 Using dummy coordinates for '{address}'")
+        _warn_once("📍 Using dummy coordinates for addresses that cannot be geocoded")
         return {
             'lat': 20.5937,  # Center of India
             'lon': 78.9629
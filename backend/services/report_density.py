@@ -0,0 +1,98 @@
+"""
+Time-decayed density grid of user reports.
+Each report adds a weight for its risk level to its grid cell, and cell
+weights decay exponentially, so the grid is updated incrementally and read
+with a single dictionary lookup per point.
+"""
+import math
+import time
+import numpy as np
+
+RISK_LEVEL_WEIGHTS = {
+    'low': 0.25,
+    'moderate': 0.5,
+    'high': 1.0,
+    'severe': 1.5
+}
+
+
+def density_risk_multiplier(density, weight, saturation):
+    """
+    Risk multiplier for a report density (scalar or array).
+
+    Grows linearly from 1 to 1 + weight as density approaches saturation.
+    """
+    return 1 + weight * np.minimum(1.0, np.asarray(density) / saturation)
+
+
+class ReportDensityGrid:
+    def __init__(self, cell_degrees=0.01, half_life_hours=6):
+        self.cell_degrees = cell_degrees
+        self.decay_rate = math.log(2) / (half_life_hours * 3600)
+        self.cells = {}  # (row, col) -> [weight, timestamp of weight]
+
+    def cell(self, lat, lon):
+        return (int(math.floor(lat / self.cell_degrees)), int(math.floor(lon / self.cell_degrees)))
+
+    def add(self, lat, lon, risk_level, timestamp=None):
+        """
+        Add a report to its cell.
+
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            risk_level (str): Reported risk level
+            timestamp (float, optional): Report time. Defaults to now.
+
+        Returns:
+            tuple: The updated cell
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        weight = RISK_LEVEL_WEIGHTS.get(risk_level, 0.5)
+        key = self.cell(lat, lon)
+        entry = self.cells.get(key)
+
+        if entry is None:
+            self.cells[key] = [weight, timestamp]
+        elif timestamp >= entry[1]:
+            entry[0] = entry[0] * math.exp(-self.decay_rate * (timestamp - entry[1])) + weight
+            entry[1] = timestamp
+        else:
+            # Out-of-order report: decay its weight to the cell's time instead
+            entry[0] += weight * math.exp(-self.decay_rate * (entry[1] - timestamp))
+        return key
+
+    def density(self, lat, lon, now=None):
+        """Decayed report weight of the cell containing a point."""
+        entry = self.cells.get(self.cell(lat, lon))
+        if entry is None:
+            return 0.0
+        if now is None:
+            now = time.time()
+        return entry[0] * math.exp(-self.decay_rate * max(0.0, now - entry[1]))
+
+    def density_many(self, lats, lons, now=None):
+        """
+        Decayed report weights for arrays of points.
+
+        Returns:
+            np.ndarray: Density for each point
+        """
+        if now is None:
+            now = time.time()
+        rows = np.floor(np.asarray(lats, dtype=float) / self.cell_degrees).astype(np.int64)
+        cols = np.floor(np.asarray(lons, dtype=float) / self.cell_degrees).astype(np.int64)
+
+        weights = np.zeros(len(rows))
+        stamps = np.full(len(rows), now, dtype=float)
+        if self.cells:
+            for i, key in enumerate(zip(rows.tolist(), cols.tolist())):
+                entry = self.cells.get(key)
+                if entry is not None:
+                    weights[i], stamps[i] = entry
+        return weights * np.exp(-self.decay_rate * np.maximum(0.0, now - stamps))
+
+    def cell_center(self, key):
+        """Latitude and longitude of a cell's centre."""
+        return ((key[0] + 0.5) * self.cell_degrees, (key[1] + 0.5) * self.cell_degrees)
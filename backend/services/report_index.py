@@ -0,0 +1,99 @@
+"""
+Grid-bucketed spatial index over user report locations.
+Maintained incrementally as reports are added; nearby queries prefilter by
+bounding box and compute exact distances with vectorized haversine.
+"""
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance in km from one point to arrays of points."""
+    lat1 = math.radians(lat)
+    lats2 = np.radians(lats)
+    dlat = lats2 - lat1
+    dlon = np.radians(lons) - math.radians(lon)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lats2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class ReportSpatialIndex:
+    def __init__(self, cell_degrees=0.05):
+        self.cell_degrees = cell_degrees
+        self.cells = {}
+        self.size = 0
+        self._lats = np.empty(1024)
+        self._lons = np.empty(1024)
+        self._positions = np.empty(1024, dtype=np.int64)
+
+    def _cell(self, lat, lon):
+        return (int(math.floor(lat / self.cell_degrees)), int(math.floor(lon / self.cell_degrees)))
+
+    def add(self, position, lat, lon):
+        """
+        Add a report location to the index.
+
+        Args:
+            position (int): Position of the report in the report list
+            lat (float): Latitude
+            lon (float): Longitude
+        """
+        if self.size == len(self._lats):
+            capacity = 2 * len(self._lats)
+            self._lats = np.resize(self._lats, capacity)
+            self._lons = np.resize(self._lons, capacity)
+            self._positions = np.resize(self._positions, capacity)
+
+        slot = self.size
+        self._lats[slot] = lat
+        self._lons[slot] = lon
+        self._positions[slot] = position
+        self.size += 1
+        self.cells.setdefault(self._cell(lat, lon), []).append(slot)
+
+    def _candidate_slots(self, lat, lon, radius_km):
+        """Slots of all entries in the cells overlapping the query bounding box."""
+        dlat = radius_km / KM_PER_DEGREE
+        dlon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+        min_cell = self._cell(lat - dlat, lon - dlon)
+        max_cell = self._cell(lat + dlat, lon + dlon)
+
+        n_cells = (max_cell[0] - min_cell[0] + 1) * (max_cell[1] - min_cell[1] + 1)
+        slots = []
+        if n_cells <= len(self.cells):
+            for row in range(min_cell[0], max_cell[0] + 1):
+                for col in range(min_cell[1], max_cell[1] + 1):
+                    slots.extend(self.cells.get((row, col), ()))
+        else:
+            # Very large radius: walk the occupied cells instead of the bounding box
+            for (row, col), cell_slots in self.cells.items():
+                if min_cell[0] <= row <= max_cell[0] and min_cell[1] <= col <= max_cell[1]:
+                    slots.extend(cell_slots)
+        return np.array(slots, dtype=np.int64)
+
+    def query(self, lat, lon, radius_km):
+        """
+        Find indexed reports within a radius.
+
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            radius_km (float): Radius in kilometers
+
+        Returns:
+            tuple: (positions, distances_km) sorted by distance
+        """
+        slots = self._candidate_slots(lat, lon, radius_km)
+        if len(slots) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        distances = haversine_km(lat, lon, self._lats[slots], self._lons[slots])
+        within = distances <= radius_km
+        slots = slots[within]
+        distances = distances[within]
+
+        order = np.argsort(distances, kind='stable')
+        return self._positions[slots[order]], distances[order]
@@ -0,0 +1,254 @@
+"""
+Append-only storage for user reports.
+Reports live in a compact JSON snapshot plus a JSON-lines log of newer
+reports. Appends are group-committed by a single writer thread, other
+worker processes pick up new log lines by tailing the file, and the log is
+folded back into the snapshot in the background once it grows large.
+"""
+import os
+import json
+import time
+import uuid
+import queue
+import threading
+
+from services.file_lock import FileLock
+
+
+class ReportStore:
+    def __init__(self, data_dir, compact_threshold=10000, max_batch=1000):
+        self.snapshot_file = os.path.join(data_dir, 'user_reports.json')
+        self.log_file = os.path.join(data_dir, 'user_reports.log.jsonl')
+        self.lock_file = os.path.join(data_dir, 'user_reports.lock')
+        self.compact_threshold = compact_threshold
+        self.max_batch = max_batch
+
+        self._log_inode = None
+        self._log_offset = 0
+        self._appended = 0  # log records not yet compacted, as seen by this process
+        self._read_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._writer = None
+        self._compacting = threading.Event()
+
+    @staticmethod
+    def new_id():
+        """
+        Generate a report ID that is unique across worker processes.
+
+        IDs start with the millisecond clock, so reports with the same
+        timestamp keep their arrival order in the time index.
+        """
+        return f"{int(time.time() * 1000):012x}{uuid.uuid4().hex[:20]}"
+
+    def last_modified(self):
+        """Modification time of the newest report file (seconds), or None if there are none."""
+        mtimes = []
+        for path in (self.snapshot_file, self.log_file):
+            try:
+                mtimes.append(os.stat(path).st_mtime)
+            except FileNotFoundError:
+                continue
+        return max(mtimes) if mtimes else None
+
+    def _exclusive(self):
+        """Take an exclusive cross-process lock on the lock file."""
+        return FileLock(self.lock_file)
+
+    def _shared(self):
+        """Take a shared cross-process lock on the lock file (excludes compaction)."""
+        return FileLock(self.lock_file, shared=True)
+
+    def _read_snapshot(self):
+        if os.path.exists(self.snapshot_file):
+            try:
+                with open(self.snapshot_file, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, IOError):
+                return []
+        return []
+
+    def _read_log(self, offset, expected_inode=None):
+        """
+        Read complete log lines from a byte offset.
+
+        Args:
+            offset (int): Byte offset to read from
+            expected_inode (int, optional): Inode the offset belongs to. If the open
+                log is a different file (or shorter than the offset), nothing is read.
+
+        Returns:
+            tuple: (records, new_offset, inode); a trailing partial line is left unread.
+                None if the log no longer matches expected_inode.
+        """
+        try:
+            with open(self.log_file, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                if expected_inode is not None and (stat.st_ino != expected_inode or stat.st_size < offset):
+                    return None
+                f.seek(offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return None if expected_inode is not None else ([], 0, None)
+
+        end = chunk.rfind(b'\n') + 1
+        records = []
+        for line in chunk[:end].splitlines():
+            if line.strip():
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return records, offset + end, stat.st_ino
+
+    def load(self):
+        """
+        Load all reports from the snapshot and the log.
+
+        Returns:
+            list: Reports in commit order
+        """
+        with self._read_lock:
+            # Hold off compaction, so the snapshot and the log belong together
+            lock = self._shared()
+            try:
+                reports = self._read_snapshot()
+                records, self._log_offset, self._log_inode = self._read_log(0)
+            finally:
+                lock.close()
+            seen = {report.get('id') for report in reports}
+            self._appended = len(records)
+            reports.extend(r for r in records if r.get('id') not in seen)
+            return reports
+
+    def refresh(self):
+        """
+        Pick up reports committed since the last read, including other workers' appends.
+
+        Returns:
+            tuple: (records, reloaded). When the log was compacted in the meantime,
+                reloaded is True and records holds the full report list.
+        """
+        try:
+            stat = os.stat(self.log_file)
+        except FileNotFoundError:
+            stat = None
+
+        with self._read_lock:
+            inode = stat.st_ino if stat else None
+            if inode == self._log_inode and (stat is None or stat.st_size == self._log_offset):
+                return [], False
+            # The inode is checked again on the open file, so a compaction landing
+            # after the stat above is never read from the old offset. A log
+            # appearing for the first time is read from the start, not reloaded.
+            result = self._read_log(self._log_offset, self._log_inode)
+            if result is not None:
+                records, self._log_offset, self._log_inode = result
+                return records, False
+
+        return self.load(), True
+
+    def append(self, reports):
+        """
+        Durably append reports, blocking until their group commit completes.
+
+        Concurrent callers are batched into a single write and fsync.
+
+        Args:
+            reports (list): Reports to append (each already carrying an id)
+        """
+        if not reports:
+            return
+        if self._writer is None or not self._writer.is_alive():
+            with self._read_lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(target=self._write_loop, daemon=True)
+                    self._writer.start()
+
+        done = threading.Event()
+        result = {}
+        self._queue.put((reports, done, result))
+        done.wait()
+        if 'error' in result:
+            raise result['error']
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            pending = len(batch[0][0])
+            while pending < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                pending += len(item[0])
+
+            payload = ''.join(
+                json.dumps(report, separators=(',', ':')) + '\n'
+                for reports, _, _ in batch for report in reports
+            ).encode('utf-8')
+
+            error = None
+            try:
+                lock = self._exclusive()
+                try:
+                    with open(self.log_file, 'ab') as f:
+                        f.write(payload)
+                        f.flush()
+                        os.fsync(f.fileno())
+                finally:
+                    lock.close()
+            except Exception as e:
+                print(f"❌ Error committing user reports: {e}")
+                error = e
+
+            for _, done, result in batch:
+                if error is not None:
+                    result['error'] = error
+                done.set()
+
+            if error is None:
+                self._appended += pending
+                if self._appended >= self.compact_threshold:
+                    self.compact_in_background()
+
+    def compact_in_background(self):
+        """Start a background compaction unless one is already running."""
+        if self._compacting.is_set():
+            return
+        self._compacting.set()
+        threading.Thread(target=self._compact_and_reset, daemon=True).start()
+
+    def _compact_and_reset(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"⚠️ User report compaction failed: {e}")
+        finally:
+            self._compacting.clear()
+
+    def compact(self):
+        """Fold the log into a new snapshot and start an empty log."""
+        lock = self._exclusive()
+        try:
+            reports = self._read_snapshot()
+            seen = {report.get('id') for report in reports}
+            records, _, _ = self._read_log(0)
+            reports.extend(r for r in records if r.get('id') not in seen)
+            self._appended = 0
+
+            snapshot_tmp = f"{self.snapshot_file}.tmp"
+            with open(snapshot_tmp, 'w') as f:
+                json.dump(reports, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(snapshot_tmp, self.snapshot_file)
+
+            # Replace rather than truncate so readers notice the new inode and reload
+            log_tmp = f"{self.log_file}.tmp"
+            open(log_tmp, 'wb').close()
+            os.replace(log_tmp, self.log_file)
+            print(f"🗜️ Compacted {len(records)} logged user reports into snapshot")
+        finally:
+            lock.close()
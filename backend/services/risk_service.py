@@ -12,8 +12,15 @@ from datetime import datetime
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import MODEL_PATH, ENHANCED_MODEL_METADATA, RISK_LEVELS
+from config import (
+    MODEL_PATH, ENHANCED_MODEL_METADATA, RISK_LEVELS,
+    REPORT_DENSITY_SATURATION, REPORT_RISK_WEIGHT
+)
 from services.weather_service import weather_service
+from services.spatial_resolver import spatial_resolver
+from services.segment_cache import segment_cache, segment_keys
+from services.user_reports import user_report_service
+from services.report_density import density_risk_multiplier
 
 class RiskService:
     def __init__(self):
@@ -22,6 +29,7 @@ class RiskService:
         self.scaler = self.model_data.get('scaler')
         self.feature_names = self.model_data.get('feature_names', [])
         self.model_metadata = self._load_model_metadata()
+        self.model_version, self.model_modified = self._model_version()
         self.risk_levels = RISK_LEVELS
     
     def _load_enhanced_model(self):
@@ -50,6 +58,24 @@ class RiskService:
                 print(f"Warning: Could not load model metadata: {e}")
         return {}
     
+    def _model_version(self):
+        """
+        Identify the loaded model and metadata files by mtime and size.
+        
+        Returns:
+            tuple: (version, last_modified); last_modified is None for the dummy model
+        """
+        parts, mtimes = [], []
+        for path in (MODEL_PATH, ENHANCED_MODEL_METADATA):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                parts.append('none')
+                continue
+            parts.append(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+            mtimes.append(stat.st_mtime)
+        return '.'.join(parts), max(mtimes) if mtimes else None
+    
     def _create_dummy_model(self):
         """Create a dummy model for testing when real model is not available."""
         from sklearn.ensemble import RandomForestClassifier
@@ -96,78 +122,120 @@ class RiskService:
         features = self._create_feature_vector(location, weather_data, time)
         
         # Make prediction using enhanced model
+        risk_score = float(self._score_features([features], [weather_data], time)[0])
+        risk_score = float(self._apply_report_density([location], [risk_score])[0])
+        risk_level = self._risk_level(risk_score)
+        
+        return {
+            'risk_score': risk_score,
+            'risk_level': risk_level,
+            'weather': weather_data,
+            'location': location,
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'model_info': {
+                'model_type': self.model_data.get('model_type', 'Unknown'),
+                'features_used': len(self.feature_names)
+            }
+        }
+    
+    def _score_features(self, feature_rows, weather_list, time):
+        """
+        Score a batch of feature vectors with a single model call.
+        
+        Args:
+            feature_rows (list): Feature vectors from _create_feature_vector
+            weather_list (list): Weather data for each row
+            time (datetime): Time of prediction
+            
+        Returns:
+            np.ndarray: Risk scores in the 15-95% range
+        """
         try:
             if self.model and self.scaler:
                 # Scale features
-                X_scaled = self.scaler.transform([features])
+                X_scaled = self.scaler.transform(np.asarray(feature_rows, dtype=float))
                 
                 # Get prediction (binary classification: 0=low risk, 1=high risk)
-                prediction = self.model.predict(X_scaled)[0]
+                predictions = self.model.predict(X_scaled).astype(float)
                 
-                # Get prediction probability for risk score
+                # Use probability of high risk class as base risk score
                 if hasattr(self.model, 'predict_proba'):
-                    proba = self.model.predict_proba(X_scaled)[0]
-                    # Use probability of high risk class as base risk score
-                    base_risk_score = float(proba[1]) if len(proba) > 1 else float(prediction)
+                    proba = self.model.predict_proba(X_scaled)
+                    base_scores = proba[:, 1] if proba.shape[1] > 1 else predictions
                 else:
-                    base_risk_score = float(prediction)
+                    base_scores = predictions
                 
                 # Apply realistic risk scaling (15-85% range instead of 0-100%)
                 # Real-world accident risk should be meaningful
-                risk_score = 0.15 + (base_risk_score * 0.70)  # Scale to 15-85% range
+                risk_scores = 0.15 + (base_scores * 0.70)  # Scale to 15-85% range
                 
                 # Apply additional risk factors for realism
-                risk_multiplier = self._calculate_risk_multipliers(weather_data, time)
-                risk_score = min(0.95, risk_score * risk_multiplier)  # Cap at 95%
+                multipliers = np.array([self._calculate_risk_multipliers(w, time) for w in weather_list])
+                risk_scores = np.minimum(0.95, risk_scores * multipliers)  # Cap at 95%
                 
-                print(f"📈 Enhanced model prediction: {prediction}, base: {base_risk_score:.3f}, final: {risk_score:.3f}")
+                if len(risk_scores) == 1:
+                    print(f"📈 Enhanced model prediction: {predictions[0]:.0f}, base: {base_scores[0]:.3f}, final: {risk_scores[0]:.3f}")
+                else:
+                    print(f"📈 Enhanced model batch prediction: {len(risk_scores)} points, mean: {risk_scores.mean():.3f}")
             else:
                 # Fallback calculation
-                risk_score = self._calculate_fallback_risk(weather_data, time)
-                print(f"⚠️ Using fallback risk calculation: {risk_score:.3f}")
+                risk_scores = np.array([self._calculate_fallback_risk(w, time) for w in weather_list])
+                print(f"⚠️ Using fallback risk calculation for {len(risk_scores)} points")
         except Exception as e:
             print(f"❌ Prediction error: {e}")
             # Fallback to simple risk calculation
-            risk_score = self._calculate_fallback_risk(weather_data, time)
+            risk_scores = np.array([self._calculate_fallback_risk(w, time) for w in weather_list])
         
         # Ensure risk score is between 0.15 and 0.95 (15-95% realistic range)
-        risk_score = max(0.15, min(0.95, risk_score))
-        
-        # Determine risk level based on realistic thresholds
-        if risk_score >= 0.70:  # 70%+ = high risk
-            risk_level = 'high'
-        elif risk_score >= 0.45:  # 45-70% = moderate risk
-            risk_level = 'moderate'
-        else:  # 15-45% = low risk
-            risk_level = 'low'
-        
-        return {
-            'risk_score': risk_score,
-            'risk_level': risk_level,
-            'weather': weather_data,
-            'location': location,
-            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
-            'model_info': {
-                'model_type': self.model_data.get('model_type', 'Unknown'),
-                'features_used': len(self.feature_names)
-            }
-        }
+        return np.clip(risk_scores, 0.15, 0.95)
     
-    def predict_route_risk(self, route_points):
+    def _apply_report_density(self, locations, risk_scores):
         """
-        Predict risk for a route (sequence of points).
+        Raise risk scores where users have recently reported hazards.
         
         Args:
-            route_points (list): List of location points with lat and lon
+            locations (list): Locations with lat and lon
+            risk_scores (list): Model risk scores for the locations
             
         Returns:
-            list: Risk predictions for each point
+            np.ndarray: Adjusted risk scores, capped at 95%
         """
-        predictions = []
-        for point in route_points:
-            risk = self.predict_risk(point)
-            predictions.append(risk)
+        risk_scores = np.asarray(risk_scores, dtype=float)
+        if not user_report_service.density_grid.cells or len(risk_scores) == 0:
+            return risk_scores
+        
+        density = user_report_service.report_density(
+            [location['lat'] for location in locations],
+            [location['lon'] for location in locations]
+        )
+        multiplier = density_risk_multiplier(density, REPORT_RISK_WEIGHT, REPORT_DENSITY_SATURATION)
+        return np.minimum(0.95, risk_scores * multiplier)
+    
+    def _risk_level(self, risk_score):
+        """Map a risk score to a risk level using realistic thresholds."""
+        if risk_score >= 0.70:  # 70%+ = high risk
+            return 'high'
+        elif risk_score >= 0.45:  # 45-70% = moderate risk
+            return 'moderate'
+        else:  # 15-45% = low risk
+            return 'low'
+    
+    def _weather_bucket(self, weather_data):
+        """
+        Reduce weather data to the fields that change the risk score.
         
+        Precipitation enters the features as is, so it is kept exact; visibility
+        and wind speed only matter through the multiplier thresholds.
+        """
+        wind_speed = weather_data.get('wind_speed', 0)
+        visibility = weather_data.get('visibility', 1.0)
+        return (
+            weather_data.get('weather_condition', 'Clear'),
+            weather_data.get('precipitation', 0),
+            0 if visibility < 0.5 else 1 if visibility < 0.8 else 2,
+            0 if wind_speed <= 15 else 1
+        )
+    
     def _create_feature_vector(self, location, weather_data, time):
         """
         Create feature vector based on enhanced model's expected features.
@@ -185,11 +253,14 @@ class RiskService:
         }
         weather_encoded = weather_map.get(weather_data.get('weather_condition', 'Clear'), 0)
         
+        # Resolve location to the state/city codes used in training
+        place = spatial_resolver.resolve(location.get('lat', 0), location.get('lon', 0))
+        
         # Create feature vector with 70 features (matching our enhanced model)
         features = [
             # Basic encoded features
-            hash(str(location.get('lat', 0))[:5]) % 100,  # state_encoded (simplified)
-            hash(str(location.get('lon', 0))[:5]) % 50,   # city_encoded (simplified)
+            place['state_code'],  # state_encoded
+            place['city_code'],   # city_encoded
             2023,  # year
             month,  # month
             1,     # vehicles_involved (default)
@@ -375,22 +446,104 @@ class RiskService:
         # Ensure realistic range (20-80%)
         return max(0.20, min(0.80, total_risk))
     
-    def predict_route_risk(self, route_points):
+    def predict_route_risk(self, route_points, time=None):
         """
         Predict risk for a route (sequence of points).
         
         Args:
             route_points (list): List of location points with lat and lon
+            time (datetime, optional): Time for prediction. Defaults to current time.
             
         Returns:
             list: Risk predictions for each point
         """
-        predictions = []
-        for point in route_points:
-            risk = self.predict_risk(point)
-            predictions.append(risk)
+        return self.predict_routes_risk([route_points], time)[0]
+    
+    def predict_routes_risk(self, routes, time=None):
+        """
+        Predict risk for several routes in one batch.
+        
+        Points are mapped to road-segment keys and scored per hour/weather
+        bucket. Segments and weather cells shared between routes are resolved
+        once, and only segments missing from the shared segment cache are sent
+        to the model, in a single batch.
+        
+        Args:
+            routes (list): Routes, each a list of location points with lat and lon
+            time (datetime, optional): Time for prediction. Defaults to current time.
+            
+        Returns:
+            list: Risk predictions for each point of each route
+        """
+        if time is None:
+            time = datetime.now()
+        
+        # Flatten routes; segment bearings are computed per route
+        points = [point for route in routes for point in route]
+        segments = [
+            segment for route in routes
+            for segment in segment_keys([(point['lat'], point['lon']) for point in route])
+        ]
+        
+        # Fetch weather once per weather cache cell
+        weather_by_cell = {}
+        weather_list = []
+        for point in points:
+            cell = weather_service._get_cache_key(point['lat'], point['lon'])
+            if cell not in weather_by_cell:
+                weather_by_cell[cell] = weather_service.get_current_weather(point['lat'], point['lon'])
+            weather_list.append(weather_by_cell[cell])
+        
+        # Model version, segment key, time and weather bucket identify a cached score
+        time_bucket = (time.month, time.weekday(), time.hour)
+        keys = [
+            (self.model_version, segment, time_bucket, self._weather_bucket(weather))
+            for segment, weather in zip(segments, weather_list)
+        ]
+        scores = segment_cache.get_many(keys)
+        
+        # Score each uncached key once
+        missing = {}
+        for i, key in enumerate(keys):
+            if scores[i] is None and key not in missing:
+                missing[key] = i
+        
+        if missing:
+            rows = list(missing.values())
+            features = [self._create_feature_vector(points[i], weather_list[i], time) for i in rows]
+            new_scores = self._score_features(features, [weather_list[i] for i in rows], time)
+            computed = dict(zip(missing.keys(), new_scores.tolist()))
+            segment_cache.put_many(computed.items())
+            scores = [computed[key] if score is None else score for key, score in zip(keys, scores)]
+        
+        # Cached scores are model-only; recent user reports are applied on top
+        scores = self._apply_report_density(points, scores).tolist()
+        
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+        model_info = {
+            'model_type': self.model_data.get('model_type', 'Unknown'),
+            'features_used': len(self.feature_names)
+        }
+        
+        predictions = [
+            {
+                'risk_score': score,
+                'risk_level': self._risk_level(score),
+                'weather': weather,
+                'location': point,
+                'timestamp': timestamp,
+                'model_info': model_info
+            }
+            for point, weather, score in zip(points, weather_list, scores)
+        ]
         
-        return predictions
+        # Split back into routes
+        results = []
+        offset = 0
+        for route in routes:
+            results.append(predictions[offset:offset + len(route)])
+            offset += len(route)
+        return results
 
 # Singleton instance
 risk_service = RiskService()
\ No newline at end of file
@@ -0,0 +1,250 @@
+"""
+Route geometry helpers for risk scoring.
+Decodes and normalizes route geometries, simplifies them with Douglas-Peucker
+and resamples them at a fixed spacing so scoring cost follows route length.
+"""
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+# Interior samples closer than this to the route's end are dropped (meters)
+END_GAP_M = 1.0
+
+
+def decode_polyline(encoded, precision=5):
+    """
+    Decode a Google encoded polyline.
+
+    Args:
+        encoded (str): Encoded polyline
+        precision (int, optional): Coordinate precision. Defaults to 5 (OSRM uses 5 or 6).
+
+    Returns:
+        np.ndarray: (n, 2) array of [lat, lon]
+    """
+    coords = []
+    index = lat = lon = 0
+    factor = 10 ** precision
+
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            result = shift = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        coords.append((lat / factor, lon / factor))
+
+    return np.array(coords, dtype=float).reshape(-1, 2)
+
+
+def encode_polyline(coords, precision=5):
+    """
+    Encode coordinates as a Google encoded polyline (the inverse of decode_polyline).
+
+    Args:
+        coords: (n, 2) array or list of [lat, lon]
+        precision (int, optional): Coordinate precision. Defaults to 5.
+
+    Returns:
+        str: Encoded polyline
+    """
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    values = np.round(coords * 10 ** precision).astype(np.int64)
+    deltas = np.diff(values, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    zigzag = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    chars = []
+    for value in zigzag.tolist():
+        while value >= 0x20:
+            chars.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        chars.append(chr(value + 63))
+    return ''.join(chars)
+
+
+def parse_route_points(route):
+    """
+    Normalize a route geometry to an array of coordinates.
+
+    Accepts an encoded polyline string, a list of {'lat', 'lon'} or
+    {'lat', 'lng'} dicts, or a list of [lat, lon] pairs.
+
+    Returns:
+        np.ndarray: (n, 2) array of [lat, lon]
+
+    Raises:
+        ValueError: If the geometry cannot be parsed
+    """
+    if isinstance(route, str):
+        return decode_polyline(route)
+
+    if not isinstance(route, (list, tuple)):
+        raise ValueError('Route must be an encoded polyline or a list of points')
+
+    coords = []
+    for point in route:
+        if isinstance(point, dict):
+            lon = point.get('lon', point.get('lng'))
+            coords.append((float(point['lat']), float(lon)))
+        else:
+            coords.append((float(point[0]), float(point[1])))
+    return np.array(coords, dtype=float).reshape(-1, 2)
+
+
+def segment_lengths(coords):
+    """Haversine length in meters of each segment of a polyline."""
+    lat = np.radians(coords[:, 0])
+    lon = np.radians(coords[:, 1])
+    dlat = np.diff(lat)
+    dlon = np.diff(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def cumulative_distance(coords):
+    """Distance in meters from the first point to each point along the polyline."""
+    return np.concatenate([[0.0], np.cumsum(segment_lengths(coords))])
+
+
+def _project(coords):
+    """Project coordinates to local planar meters around the route's mean latitude."""
+    cos_lat = np.cos(np.radians(coords[:, 0].mean()))
+    scale = np.pi / 180 * EARTH_RADIUS_M
+    return np.column_stack([coords[:, 1] * cos_lat * scale, coords[:, 0] * scale])
+
+
+def simplify_route(coords, tolerance_m):
+    """
+    Simplify a polyline with the Douglas-Peucker algorithm.
+
+    Args:
+        coords (np.ndarray): (n, 2) array of [lat, lon]
+        tolerance_m (float): Maximum allowed deviation in meters
+
+    Returns:
+        np.ndarray: Sorted indices of the points that are kept
+    """
+    n = len(coords)
+    if n <= 2 or tolerance_m <= 0:
+        return np.arange(n)
+
+    xy = _project(coords)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        inner = xy[start + 1:end]
+        a = xy[start]
+        ab = xy[end] - a
+        ab_len = np.hypot(ab[0], ab[1])
+        if ab_len == 0:
+            distances = np.hypot(inner[:, 0] - a[0], inner[:, 1] - a[1])
+        else:
+            distances = np.abs(ab[0] * (inner[:, 1] - a[1]) - ab[1] * (inner[:, 0] - a[0])) / ab_len
+
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance_m:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return np.flatnonzero(keep)
+
+
+def resample_route(coords, spacing_m, max_samples=None):
+    """
+    Resample a polyline at a fixed spacing along its length.
+
+    The first and last points are always included; an interior sample closer
+    than END_GAP_M to the last point is dropped rather than scored twice.
+
+    Args:
+        coords (np.ndarray): (n, 2) array of [lat, lon]
+        spacing_m (float): Sample spacing in meters
+        max_samples (int, optional): Upper bound on samples, including the last point
+
+    Returns:
+        tuple: ((m, 2) array of sample [lat, lon], (m,) array of sample distances in meters)
+    """
+    distances = cumulative_distance(coords)
+    total = distances[-1]
+
+    if total == 0 or len(coords) < 2:
+        return coords[:1].copy(), np.zeros(1)
+
+    sample_distances = np.arange(0, total, spacing_m)
+    if len(sample_distances) > 1 and total - sample_distances[-1] < END_GAP_M:
+        sample_distances = sample_distances[:-1]
+    if max_samples:
+        # Floating-point rounding in arange can add one sample past the bound
+        sample_distances = sample_distances[:max(1, max_samples - 1)]
+    sample_distances = np.append(sample_distances, total)
+
+    # Interpolate in lat/lon along the cumulative distance, skipping zero-length segments
+    unique_distances, first = np.unique(distances, return_index=True)
+    lats = np.interp(sample_distances, unique_distances, coords[first, 0])
+    lons = np.interp(sample_distances, unique_distances, coords[first, 1])
+
+    return np.column_stack([lats, lons]), sample_distances
+
+
+def prepare_route(route, spacing_m, tolerance_m, max_samples=None):
+    """
+    Simplify and resample a route for scoring.
+
+    Args:
+        route: Encoded polyline or list of points (see parse_route_points)
+        spacing_m (float): Sample spacing in meters
+        tolerance_m (float): Douglas-Peucker tolerance in meters
+        max_samples (int, optional): Upper bound on samples; spacing grows to respect it
+
+    Returns:
+        dict: points (original coordinates), samples, sample_distances and
+            point_to_sample (index of the sample scoring each original point)
+    """
+    points = parse_route_points(route)
+    if len(points) == 0:
+        raise ValueError('Route has no points')
+
+    kept = simplify_route(points, tolerance_m)
+    simplified = points[kept]
+
+    route_length = cumulative_distance(simplified)[-1]
+    if max_samples and route_length / spacing_m > max_samples - 1:
+        spacing_m = route_length / (max_samples - 1)
+
+    samples, sample_distances = resample_route(simplified, spacing_m, max_samples)
+
+    # Position of every original point along the simplified route, interpolated
+    # between the kept vertices it lies between
+    original_distances = cumulative_distance(points)
+    simplified_distances = cumulative_distance(simplified)
+    along = np.interp(original_distances, original_distances[kept], simplified_distances)
+
+    # Nearest sample for each original point
+    right = np.clip(np.searchsorted(sample_distances, along), 0, len(sample_distances) - 1)
+    left = np.clip(right - 1, 0, len(sample_distances) - 1)
+    use_left = np.abs(along - sample_distances[left]) <= np.abs(sample_distances[right] - along)
+    point_to_sample = np.where(use_left, left, right)
+
+    return {
+        'points': points,
+        'samples': samples,
+        'sample_distances': sample_distances,
+        'point_to_sample': point_to_sample,
+        'spacing_m': spacing_m,
+        'length_m': float(route_length)
+    }
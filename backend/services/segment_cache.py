@@ -0,0 +1,110 @@
+"""
+Road-segment risk cache shared across routes.
+Route points are snapped to grid cells and bucketed by travel bearing so
+overlapping routes reuse each other's segment scores.
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import SEGMENT_CACHE_SIZE, SEGMENT_CELL_DEGREES, SEGMENT_BEARING_BUCKETS
+
+
+def segment_keys(coords):
+    """
+    Build stable segment keys for a sequence of route points.
+
+    Each point is snapped to a grid cell and paired with the bucket of the
+    bearing towards the next point (the last point reuses the previous bearing).
+
+    Args:
+        coords (np.ndarray): (n, 2) array of [lat, lon]
+
+    Returns:
+        list: (cell_lat, cell_lon, bearing_bucket) tuples
+    """
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    if len(coords) == 0:
+        return []
+
+    cells = np.floor(coords / SEGMENT_CELL_DEGREES).astype(np.int64)
+
+    if len(coords) > 1:
+        lat = np.radians(coords[:, 0])
+        dlon = np.radians(np.diff(coords[:, 1]))
+        y = np.sin(dlon) * np.cos(lat[1:])
+        x = np.cos(lat[:-1]) * np.sin(lat[1:]) - np.sin(lat[:-1]) * np.cos(lat[1:]) * np.cos(dlon)
+        bearings = np.degrees(np.arctan2(y, x)) % 360
+        bearings = np.append(bearings, bearings[-1])
+    else:
+        bearings = np.zeros(1)
+
+    bucket_width = 360 / SEGMENT_BEARING_BUCKETS
+    buckets = np.floor((bearings + bucket_width / 2) / bucket_width).astype(np.int64) % SEGMENT_BEARING_BUCKETS
+
+    return list(zip(cells[:, 0].tolist(), cells[:, 1].tolist(), buckets.tolist()))
+
+
+class SegmentRiskCache:
+    def __init__(self, capacity=SEGMENT_CACHE_SIZE):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        """
+        Look up cached risk scores.
+
+        Args:
+            keys (list): Cache keys
+
+        Returns:
+            list: Cached score or None for each key
+        """
+        results = []
+        with self._lock:
+            for key in keys:
+                score = self.entries.get(key)
+                if score is None:
+                    self.misses += 1
+                else:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                results.append(score)
+        return results
+
+    def put_many(self, items):
+        """Store (key, score) pairs, evicting the least recently used entries."""
+        with self._lock:
+            for key, score in items:
+                self.entries[key] = score
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached scores, e.g. after the model is reloaded."""
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Return cache size and hit ratio."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'capacity': self.capacity,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
+
+# Singleton instance
+segment_cache = SegmentRiskCache()
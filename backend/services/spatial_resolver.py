@@ -0,0 +1,271 @@
+"""
+Spatial resolver for mapping coordinates to the state/city codes used by the model.
+Uses a precomputed grid over India so lookups are a single array index.
+"""
+import os
+import sys
+import json
+import numpy as np
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PROCESSED_DATA_DIR
+from services.columnar_store import load_features
+
+# Approximate geographic centroids for the states present in the training data
+STATE_CENTROIDS = {
+    'Andhra Pradesh': (15.9129, 79.7400),
+    'Arunachal Pradesh': (28.2180, 94.7278),
+    'Assam': (26.2006, 92.9376),
+    'Bihar': (25.0961, 85.3131),
+    'Chandigarh': (30.7333, 76.7794),
+    'Chhattisgarh': (21.2787, 81.8661),
+    'Delhi': (28.7041, 77.1025),
+    'Goa': (15.2993, 74.1240),
+    'Gujarat': (22.2587, 71.1924),
+    'Haryana': (29.0588, 76.0856),
+    'Himachal Pradesh': (31.1048, 77.1734),
+    'Jammu and Kashmir': (33.7782, 76.5762),
+    'Jharkhand': (23.6102, 85.2799),
+    'Karnataka': (15.3173, 75.7139),
+    'Kerala': (10.8505, 76.2711),
+    'Madhya Pradesh': (22.9734, 78.6569),
+    'Maharashtra': (19.7515, 75.7139),
+    'Manipur': (24.6637, 93.9063),
+    'Meghalaya': (25.4670, 91.3662),
+    'Mizoram': (23.1645, 92.9376),
+    'Nagaland': (26.1584, 94.5624),
+    'Odisha': (20.9517, 85.0985),
+    'Puducherry': (11.9416, 79.8083),
+    'Punjab': (31.1471, 75.3412),
+    'Rajasthan': (27.0238, 74.2179),
+    'Sikkim': (27.5330, 88.5122),
+    'Tamil Nadu': (11.1271, 78.6569),
+    'Telangana': (18.1124, 79.0193),
+    'Tripura': (23.9408, 91.9882),
+    'Uttar Pradesh': (27.5706, 80.0982),
+    'Uttarakhand': (30.0668, 79.0193),
+    'West Bengal': (22.9868, 87.8550),
+}
+
+# City centres for the cities present in the training data: (lat, lon, state)
+CITY_CENTROIDS = {
+    'Ahmedabad': (23.0225, 72.5714, 'Gujarat'),
+    'Bangalore': (12.9716, 77.5946, 'Karnataka'),
+    'Chennai': (13.0827, 80.2707, 'Tamil Nadu'),
+    'Coimbatore': (11.0168, 76.9558, 'Tamil Nadu'),
+    'Durgapur': (23.5204, 87.3119, 'West Bengal'),
+    'Dwarka': (28.5921, 77.0460, 'Delhi'),
+    'Jaipur': (26.9124, 75.7873, 'Rajasthan'),
+    'Jodhpur': (26.2389, 73.0243, 'Rajasthan'),
+    'Kanpur': (26.4499, 80.3319, 'Uttar Pradesh'),
+    'Kolkata': (22.5726, 88.3639, 'West Bengal'),
+    'Lucknow': (26.8467, 80.9462, 'Uttar Pradesh'),
+    'Madurai': (9.9252, 78.1198, 'Tamil Nadu'),
+    'Mangalore': (12.9141, 74.8560, 'Karnataka'),
+    'Mumbai': (19.0760, 72.8777, 'Maharashtra'),
+    'Mysore': (12.2958, 76.6394, 'Karnataka'),
+    'Nagpur': (21.1458, 79.0882, 'Maharashtra'),
+    'New Delhi': (28.6139, 77.2090, 'Delhi'),
+    'Pune': (18.5204, 73.8567, 'Maharashtra'),
+    'Rohini': (28.7495, 77.0565, 'Delhi'),
+    'Siliguri': (26.7271, 88.3953, 'West Bengal'),
+    'Surat': (21.1702, 72.8311, 'Gujarat'),
+    'Tirupati': (13.6288, 79.4192, 'Andhra Pradesh'),
+    'Udaipur': (24.5854, 73.7125, 'Rajasthan'),
+    'Vadodara': (22.3072, 73.1812, 'Gujarat'),
+    'Varanasi': (25.3176, 82.9739, 'Uttar Pradesh'),
+    'Vijayawada': (16.5062, 80.6480, 'Andhra Pradesh'),
+    'Visakhapatnam': (17.6868, 83.2185, 'Andhra Pradesh'),
+}
+
+# Grid covering India (lat_min, lat_max, lon_min, lon_max) and its cell size in degrees
+GRID_BOUNDS = (6.0, 38.0, 68.0, 98.0)
+GRID_RESOLUTION = 0.05
+
+# Points further than this from every city centre resolve to the 'Unknown' city
+CITY_RADIUS_KM = 30.0
+
+KM_PER_DEGREE = 111.32
+
+
+class SpatialResolver:
+    def __init__(self):
+        self.state_classes, self.city_classes = (
+            self._with_unknown(classes) for classes in self._load_encoder_classes()
+        )
+        self.state_codes = {name: i for i, name in enumerate(self.state_classes)}
+        self.city_codes = {name: i for i, name in enumerate(self.city_classes)}
+        self.unknown_state_code = self.state_codes['Unknown']
+        self.unknown_city_code = self.city_codes['Unknown']
+
+        # State anchors are the state centroids plus every city centre
+        anchors = [(lat, lon, state) for state, (lat, lon) in STATE_CENTROIDS.items()]
+        anchors += [(lat, lon, state) for lat, lon, state in CITY_CENTROIDS.values()]
+        self._anchor_lat = np.array([a[0] for a in anchors])
+        self._anchor_lon = np.array([a[1] for a in anchors])
+        self._anchor_state_code = np.array([self._state_code(a[2]) for a in anchors], dtype=np.int16)
+
+        self._city_names = list(CITY_CENTROIDS.keys())
+        self._city_lat = np.array([CITY_CENTROIDS[c][0] for c in self._city_names])
+        self._city_lon = np.array([CITY_CENTROIDS[c][1] for c in self._city_names])
+        self._city_code = np.array([self._city_code_for(c) for c in self._city_names], dtype=np.int16)
+
+        self._build_grid()
+
+    @staticmethod
+    def _with_unknown(classes):
+        """
+        Make sure unresolved points have a class of their own.
+
+        Classes derived from the data may lack 'Unknown' (the state column has
+        none), and falling back to code 0 would encode such points as a real
+        state. 'Unknown' is appended rather than sorted in, so the codes of the
+        trained classes stay the same.
+        """
+        classes = list(classes)
+        if 'Unknown' not in classes:
+            classes.append('Unknown')
+        return classes
+
+    def _load_encoder_classes(self):
+        """
+        Load the label encoder classes used during feature engineering.
+
+        LabelEncoder assigns codes in sorted order of the unique values, so the
+        classes are read from the feature metadata when available and otherwise
+        rebuilt from the processed dataset.
+        """
+        metadata_path = os.path.join(PROCESSED_DATA_DIR, 'feature_metadata.json')
+        if os.path.exists(metadata_path):
+            try:
+                with open(metadata_path, 'r') as f:
+                    category_codes = json.load(f).get('category_codes', {})
+                if 'state' in category_codes and 'city' in category_codes:
+                    return category_codes['state'], category_codes['city']
+            except (json.JSONDecodeError, IOError) as e:
+                print(f"Warning: Could not load feature metadata: {e}")
+
+        try:
+            df = load_features(columns=['state', 'city'])
+            if not df.empty:
+                return tuple(
+                    sorted(df[col].astype(str).where(df[col].notna(), 'Unknown').unique())
+                    for col in ('state', 'city')
+                )
+        except Exception as e:
+            print(f"Warning: Could not derive encoder classes from processed features: {e}")
+
+        print("⚠️ Encoder classes not found, using built-in location list")
+        return (sorted(set(STATE_CENTROIDS) | {'Unknown'}),
+                sorted(set(CITY_CENTROIDS) | {'Unknown'}))
+
+    def _state_code(self, state):
+        return self.state_codes.get(state, self.unknown_state_code)
+
+    def _city_code_for(self, city):
+        return self.city_codes.get(city, self.unknown_city_code)
+
+    def _nearest(self, lats, lons):
+        """
+        Resolve arrays of points by direct nearest-anchor search.
+
+        Returns:
+            tuple: (state_codes, city_codes) as int16 arrays
+        """
+        lats = np.asarray(lats, dtype=float)[:, None]
+        lons = np.asarray(lons, dtype=float)[:, None]
+        cos_lat = np.cos(np.radians(lats))
+
+        d_state = (lats - self._anchor_lat) ** 2 + ((lons - self._anchor_lon) * cos_lat) ** 2
+        state_codes = self._anchor_state_code[np.argmin(d_state, axis=1)]
+
+        d_city = (lats - self._city_lat) ** 2 + ((lons - self._city_lon) * cos_lat) ** 2
+        nearest_city = np.argmin(d_city, axis=1)
+        city_km = np.sqrt(d_city[np.arange(len(nearest_city)), nearest_city]) * KM_PER_DEGREE
+        city_codes = np.where(city_km <= CITY_RADIUS_KM, self._city_code[nearest_city],
+                              self.unknown_city_code).astype(np.int16)
+
+        return state_codes, city_codes
+
+    def _build_grid(self):
+        """Precompute the state and city code for the centre of every grid cell."""
+        lat_min, lat_max, lon_min, lon_max = GRID_BOUNDS
+        self._n_lat = int(round((lat_max - lat_min) / GRID_RESOLUTION))
+        self._n_lon = int(round((lon_max - lon_min) / GRID_RESOLUTION))
+
+        cell_lons = lon_min + (np.arange(self._n_lon) + 0.5) * GRID_RESOLUTION
+        self._grid_state = np.empty((self._n_lat, self._n_lon), dtype=np.int16)
+        self._grid_city = np.empty((self._n_lat, self._n_lon), dtype=np.int16)
+
+        # Resolve one latitude row at a time to keep the distance matrices small
+        for row in range(self._n_lat):
+            cell_lat = lat_min + (row + 0.5) * GRID_RESOLUTION
+            states, cities = self._nearest(np.full(self._n_lon, cell_lat), cell_lons)
+            self._grid_state[row] = states
+            self._grid_city[row] = cities
+
+    def resolve_many(self, lats, lons):
+        """
+        Resolve arrays of coordinates to state and city codes.
+
+        Args:
+            lats (array-like): Latitudes
+            lons (array-like): Longitudes
+
+        Returns:
+            tuple: (state_codes, city_codes) as integer NumPy arrays
+        """
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        lat_min, _, lon_min, _ = GRID_BOUNDS
+
+        rows = np.floor((lats - lat_min) / GRID_RESOLUTION).astype(np.int64)
+        cols = np.floor((lons - lon_min) / GRID_RESOLUTION).astype(np.int64)
+        inside = (rows >= 0) & (rows < self._n_lat) & (cols >= 0) & (cols < self._n_lon)
+
+        state_codes = np.empty(len(lats), dtype=np.int16)
+        city_codes = np.empty(len(lats), dtype=np.int16)
+        state_codes[inside] = self._grid_state[rows[inside], cols[inside]]
+        city_codes[inside] = self._grid_city[rows[inside], cols[inside]]
+
+        # Points outside the grid fall back to a direct search
+        if not inside.all():
+            outside = ~inside
+            state_codes[outside], city_codes[outside] = self._nearest(lats[outside], lons[outside])
+
+        return state_codes, city_codes
+
+    def resolve(self, lat, lon):
+        """
+        Resolve a single coordinate to state and city.
+
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+
+        Returns:
+            dict: state, state_code, city and city_code
+        """
+        lat_min, _, lon_min, _ = GRID_BOUNDS
+        row = int((float(lat) - lat_min) // GRID_RESOLUTION)
+        col = int((float(lon) - lon_min) // GRID_RESOLUTION)
+
+        if 0 <= row < self._n_lat and 0 <= col < self._n_lon:
+            state_code = int(self._grid_state[row, col])
+            city_code = int(self._grid_city[row, col])
+        else:
+            state_codes, city_codes = self._nearest([lat], [lon])
+            state_code = int(state_codes[0])
+            city_code = int(city_codes[0])
+
+        return {
+            'state': self.state_classes[state_code],
+            'state_code': state_code,
+            'city': self.city_classes[city_code],
+            'city_code': city_code
+        }
+
+# Singleton instance
+spatial_resolver = SpatialResolver()
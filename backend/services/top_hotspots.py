@@ -0,0 +1,286 @@
+"""
+Top-k hotspot rankings by state, city or district.
+Accident aggregates per (time bucket, weather) are computed once per dataset
+version, and each ranking keeps its labels in score order, so a request reads
+the first k entries. New user reports are folded in incrementally: report
+weights are stored relative to a fixed reference time, so exponential decay
+scales every label equally and never reorders the report ranking.
+"""
+import os
+import sys
+import math
+import time
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    REPORT_DENSITY_HALF_LIFE_HOURS, REPORT_DENSITY_SATURATION,
+    TOP_HOTSPOTS_WEIGHTS, TOP_HOTSPOTS_REFRESH_SECONDS
+)
+from services.hotspot_dataset import hotspot_dataset
+from services.user_reports import user_report_service
+from services.spatial_resolver import spatial_resolver, STATE_CENTROIDS, CITY_CENTROIDS
+from services.report_density import RISK_LEVEL_WEIGHTS
+
+LEVELS = ['state', 'city', 'district']
+SCORES = ['accidents', 'severity', 'risk', 'reports', 'combined']
+TIME_BUCKETS = ['night', 'morning', 'afternoon', 'evening']
+ALL = 'all'
+
+
+def _labels(series):
+    """Column values as strings, with missing values as 'Unknown' (works for categorical columns)."""
+    return series.astype(str).where(series.notna(), 'Unknown')
+
+
+def coordinates(level, label):
+    """Map position (lat, lon) of a state or city label, or None if it has none."""
+    if level == 'state' and label in STATE_CENTROIDS:
+        return STATE_CENTROIDS[label]
+    if level == 'city' and label in CITY_CENTROIDS:
+        return CITY_CENTROIDS[label][:2]
+    return None
+
+
+def time_bucket(hour):
+    """Time-of-day bucket of an hour, matching the is_night/is_morning/... features."""
+    hour = int(hour)
+    if hour >= 22 or hour <= 5:
+        return 'night'
+    if hour <= 9:
+        return 'morning'
+    if hour <= 17:
+        return 'afternoon'
+    return 'evening'
+
+
+class Ranking:
+    def __init__(self):
+        self.scores = {}
+        self.order = []  # (-score, label), ascending
+
+    def set(self, label, score):
+        """Insert or move a label."""
+        previous = self.scores.get(label)
+        if previous is not None:
+            del self.order[bisect_left(self.order, (-previous, label))]
+        self.scores[label] = score
+        insort(self.order, (-score, label))
+
+    def top(self, k):
+        """The k highest-scoring (label, score) pairs."""
+        return [(label, -negative) for negative, label in self.order[:k]]
+
+
+class TopHotspots:
+    def __init__(self):
+        self.decay_rate = math.log(2) / (REPORT_DENSITY_HALF_LIFE_HOURS * 3600)
+        self._lock = threading.RLock()
+        self._snapshot = None
+        self._accidents = {}   # (level, bucket, weather) -> {label: (count, severity_sum, risk_sum)}
+        self._max_counts = {}  # (level, bucket, weather) -> largest count
+        self._reset_reports()
+
+    def _reset_reports(self):
+        self._reference_time = time.time()
+        self._reports = {}     # (level, bucket) -> {label: weight scaled to the reference time}
+        self._report_list = None
+        self._report_position = 0
+        self._rankings = {}
+        self._combined_built_at = time.time()
+
+    def _load_dataset(self, snapshot):
+        """Aggregate accidents per label for every (time bucket, weather) combination."""
+        self._snapshot = snapshot
+        self._accidents = {}
+        self._max_counts = {}
+        self._rankings = {}
+        if snapshot is None:
+            return
+
+        df = snapshot.df
+        hours = pd.to_numeric(df['hour'], errors='coerce').fillna(0) if 'hour' in df else pd.Series(0, index=df.index)
+        frame = pd.DataFrame({
+            'bucket': np.select(
+                [(hours >= 22) | (hours <= 5), hours <= 9, hours <= 17],
+                ['night', 'morning', 'afternoon'], 'evening'
+            ),
+            'weather': _labels(df['weather']) if 'weather' in df else 'Unknown',
+            'severity': pd.to_numeric(df['severity_level'], errors='coerce').fillna(0) if 'severity_level' in df else 0.0,
+            'risk': pd.to_numeric(df['risk_score'], errors='coerce').fillna(0) if 'risk_score' in df else 0.0
+        }, index=df.index)
+
+        for level in LEVELS:
+            if level not in df:
+                continue
+            frame['label'] = _labels(df[level])
+            for by in (['bucket', 'weather'], ['bucket'], ['weather'], []):
+                grouped = frame.groupby(['label'] + by).agg(
+                    count=('risk', 'size'), severity=('severity', 'sum'), risk=('risk', 'sum')
+                )
+                for index, count, severity, risk in zip(grouped.index, grouped['count'], grouped['severity'], grouped['risk']):
+                    values = dict(zip(['label'] + by, index if isinstance(index, tuple) else (index,)))
+                    key = (level, values.get('bucket', ALL), values.get('weather', ALL))
+                    self._accidents.setdefault(key, {})[values['label']] = (int(count), float(severity), float(risk))
+
+        for key, groups in self._accidents.items():
+            self._max_counts[key] = max(totals[0] for totals in groups.values())
+
+    def _sync(self):
+        """Pick up a reloaded dataset and reports added since the last call."""
+        snapshot = hotspot_dataset.current()
+        if snapshot is not self._snapshot:
+            self._load_dataset(snapshot)
+
+        user_report_service.refresh()
+        reports = user_report_service.reports
+        if reports is not self._report_list:
+            # Report list was rebuilt (e.g. after compaction): start over
+            self._reset_reports()
+            self._report_list = reports
+        while self._report_position < len(reports):
+            self._add_report(reports[self._report_position])
+            self._report_position += 1
+
+        if time.time() - self._combined_built_at > TOP_HOTSPOTS_REFRESH_SECONDS:
+            # Saturation makes decay reorder the combined ranking, so rebuild it now and then
+            for key in [key for key in self._rankings if key[3] == 'combined']:
+                del self._rankings[key]
+            self._combined_built_at = time.time()
+
+    def _add_report(self, report):
+        try:
+            lat, lon = float(report['location']['lat']), float(report['location']['lon'])
+        except (KeyError, TypeError, ValueError):
+            return
+        timestamp = report.get('timestamp') or time.time()
+
+        exponent = self.decay_rate * (timestamp - self._reference_time)
+        if exponent > 500:
+            # Keep relative weights within float range by moving the reference time
+            reports, position = self._report_list, self._report_position
+            self._reset_reports()
+            self._report_list = reports
+            for earlier in reports[:position]:
+                self._add_report(earlier)
+            self._report_position = position
+            exponent = self.decay_rate * (timestamp - self._reference_time)
+        weight = RISK_LEVEL_WEIGHTS.get(report.get('risk_level'), 0.5) * math.exp(exponent)
+
+        # Coordinates resolve to a state and city only, so reports do not count towards districts
+        place = spatial_resolver.resolve(lat, lon)
+        labels = {'state': place['state'], 'city': place['city']}
+        bucket = time_bucket(datetime.fromtimestamp(timestamp).hour)
+
+        for level, label in labels.items():
+            for key_bucket in (bucket, ALL):
+                weights = self._reports.setdefault((level, key_bucket), {})
+                weights[label] = weights.get(label, 0.0) + weight
+                # Update rankings that already exist; others are built on first use
+                for weather in self._weathers(level, key_bucket):
+                    for score in ('reports', 'combined'):
+                        ranking = self._rankings.get((level, key_bucket, weather, score))
+                        if ranking is not None:
+                            ranking.set(label, self._score(level, key_bucket, weather, score, label))
+
+    def _weathers(self, level, bucket):
+        return {key[2] for key in self._rankings if key[0] == level and key[1] == bucket}
+
+    def _decay_factor(self):
+        return math.exp(-self.decay_rate * (time.time() - self._reference_time))
+
+    def _score(self, level, bucket, weather, score, label):
+        count, severity_sum, risk_sum = self._accidents.get((level, bucket, weather), {}).get(label, (0, 0.0, 0.0))
+        weight = self._reports.get((level, bucket), {}).get(label, 0.0)
+
+        if score == 'accidents':
+            return float(count)
+        if score == 'severity':
+            return severity_sum
+        if score == 'risk':
+            return risk_sum / count if count else 0.0
+        if score == 'reports':
+            return weight  # ordered by relative weight; decayed on output
+
+        density = weight * self._decay_factor()
+        max_count = self._max_counts.get((level, bucket, weather)) or 1
+        return (
+            TOP_HOTSPOTS_WEIGHTS['accidents'] * count / max_count
+            + TOP_HOTSPOTS_WEIGHTS['severity'] * (severity_sum / count / 2 if count else 0.0)
+            + TOP_HOTSPOTS_WEIGHTS['risk'] * (risk_sum / count if count else 0.0)
+            + TOP_HOTSPOTS_WEIGHTS['reports'] * min(1.0, density / REPORT_DENSITY_SATURATION)
+        )
+
+    def _ranking(self, level, bucket, weather, score):
+        key = (level, bucket, weather, score)
+        ranking = self._rankings.get(key)
+        if ranking is None:
+            ranking = Ranking()
+            labels = set(self._accidents.get((level, bucket, weather), {}))
+            if score in ('reports', 'combined'):
+                labels |= set(self._reports.get((level, bucket), {}))
+            for label in labels:
+                ranking.set(label, self._score(level, bucket, weather, score, label))
+            self._rankings[key] = ranking
+        return ranking
+
+    def top(self, k=10, level='state', score='combined', bucket=ALL, weather=ALL, labels=None):
+        """
+        Get the k highest-ranked hotspots.
+
+        Args:
+            k (int, optional): Number of hotspots. Defaults to 10.
+            level (str, optional): state, city or district. Defaults to 'state'.
+            score (str, optional): accidents, severity, risk, reports or combined. Defaults to 'combined'.
+            bucket (str, optional): Time-of-day bucket or 'all'. Defaults to 'all'.
+            weather (str, optional): Weather condition or 'all'. Defaults to 'all'.
+                Reports carry no weather, so they count towards every weather.
+            labels (set, optional): Only rank these labels. Defaults to all labels.
+
+        Returns:
+            list: Hotspot dicts in rank order, with the label's map position (lat/lon, None if unknown)
+
+        Raises:
+            ValueError: If level, score or bucket is unknown
+        """
+        if level not in LEVELS:
+            raise ValueError(f'level must be one of {LEVELS}')
+        if score not in SCORES:
+            raise ValueError(f'score must be one of {SCORES}')
+        if bucket != ALL and bucket not in TIME_BUCKETS:
+            raise ValueError(f"time_bucket must be one of {TIME_BUCKETS + [ALL]}")
+
+        with self._lock:
+            self._sync()
+            decay = self._decay_factor()
+            ranking = self._ranking(level, bucket, weather, score)
+            ranked = ranking.top(k) if labels is None else [
+                (label, value) for label, value in ranking.top(len(ranking.order)) if label in labels
+            ][:k]
+            hotspots = []
+            for label, value in ranked:
+                if score == 'reports' and value <= 0:
+                    break  # only labels with reports rank by report density
+                count, severity_sum, risk_sum = self._accidents.get((level, bucket, weather), {}).get(label, (0, 0.0, 0.0))
+                density = self._reports.get((level, bucket), {}).get(label, 0.0) * decay
+                lat, lon = coordinates(level, label) or (None, None)
+                hotspots.append({
+                    level: label,
+                    'lat': lat,
+                    'lon': lon,
+                    'score': value * decay if score == 'reports' else value,
+                    'accidents': count,
+                    'severity_sum': severity_sum,
+                    'mean_risk_score': risk_sum / count if count else None,
+                    'report_density': density
+                })
+            return hotspots
+
+# Singleton instance
+top_hotspots = TopHotspots()
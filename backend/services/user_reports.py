@@ -2,36 +2,159 @@
 Service for storing and retrieving user-reported risk inputs.
 """
 import os
-import json
 import time
 import sys
+import threading
+import base64
+import heapq
+from bisect import bisect_left, bisect_right
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import DATA_DIR
+from config import (
+    DATA_DIR, REPORT_LOG_COMPACT_THRESHOLD,
+    REPORT_DENSITY_CELL_DEGREES, REPORT_DENSITY_HALF_LIFE_HOURS,
+    REPORT_DENSITY_SATURATION, REPORT_RISK_WEIGHT, STREAM_MAX_BATCH
+)
+from services.report_index import ReportSpatialIndex
+from services.report_density import ReportDensityGrid, density_risk_multiplier
+from services.report_store import ReportStore
+from services.event_stream import event_stream
 
 class UserReportService:
     def __init__(self):
-        self.reports_file = os.path.join(DATA_DIR, 'user_reports.json')
-        self.reports = self._load_reports()
+        self.store = ReportStore(DATA_DIR, compact_threshold=REPORT_LOG_COMPACT_THRESHOLD)
+        self._lock = threading.RLock()
+        self._rebuild(self.store.load())
     
-    def _load_reports(self):
-        """Load user reports from file."""
-        if os.path.exists(self.reports_file):
+    def _rebuild(self, reports):
+        """Rebuild the in-memory report list and indexes."""
+        self.reports = []
+        self.report_ids = set()
+        self.spatial_index = ReportSpatialIndex()
+        self.density_grid = ReportDensityGrid(REPORT_DENSITY_CELL_DEGREES, REPORT_DENSITY_HALF_LIFE_HOURS)
+        self._time_keys = []  # sorted (timestamp, sequence number)
+        self._late_keys = []  # keys older than the index tail, merged in on the next read
+        for report in reports:
+            self._apply(report)
+    
+    def _apply(self, report, publish=False):
+        """
+        Add a committed report to the in-memory views.
+        
+        Args:
+            report (dict): Committed report
+            publish (bool, optional): Publish the report and its cell's new risk
+                to live stream subscribers. Defaults to False.
+        
+        Returns:
+            bool: False if the report was already applied
+        """
+        if report.get('id') in self.report_ids:
+            return False
+        self.report_ids.add(report.get('id'))
+        self.reports.append(report)
+        cell = self._index_report(len(self.reports) - 1, report)
+        self._index_time(len(self.reports) - 1, report)
+        
+        if publish and cell is not None:
+            self._publish(report, cell)
+        return True
+    
+    def _publish(self, report, cell):
+        """Publish a new report and the updated risk of its density cell."""
+        lat, lon = float(report['location']['lat']), float(report['location']['lon'])
+        event_stream.publish('report', lat, lon, report)
+        
+        density = self.density_grid.density(lat, lon)
+        center_lat, center_lon = self.density_grid.cell_center(cell)
+        event_stream.publish('cell_risk', center_lat, center_lon, {
+            'cell': {
+                'lat': center_lat,
+                'lon': center_lon,
+                'size_degrees': self.density_grid.cell_degrees
+            },
+            'report_density': density,
+            'risk_multiplier': float(density_risk_multiplier(density, REPORT_RISK_WEIGHT, REPORT_DENSITY_SATURATION))
+        })
+    
+    def _publish_bulk(self, reports):
+        """Publish one summary event for a batch of reports instead of one event per report."""
+        points = []
+        for report in reports:
             try:
-                with open(self.reports_file, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError):
-                return []
+                points.append((float(report['location']['lat']), float(report['location']['lon'])))
+            except (KeyError, TypeError, ValueError):
+                continue
+        bounds = None
+        if points:
+            lats, lons = zip(*points)
+            bounds = {'south': min(lats), 'west': min(lons), 'north': max(lats), 'east': max(lons)}
+        # No point location: delivered to every subscriber regardless of bbox
+        event_stream.publish('reports_bulk', None, None, {'count': len(reports), 'bounds': bounds})
+    
+    def _index_time(self, position, report):
+        """Add a report to the (timestamp, sequence) index; reports usually arrive in order."""
+        key = (report.get('timestamp', 0), position)
+        if not self._time_keys or key >= self._time_keys[-1]:
+            self._time_keys.append(key)
         else:
-            return []
+            # Inserting each late key would make a bulk upload O(n^2); merge them in one pass instead
+            self._late_keys.append(key)
+    
+    def _time_index(self):
+        """The sorted time index, with late keys merged in."""
+        if self._late_keys:
+            self._late_keys.sort()
+            self._time_keys = list(heapq.merge(self._time_keys, self._late_keys))
+            self._late_keys = []
+        return self._time_keys
     
-    def _save_reports(self):
-        """Save user reports to file."""
-        os.makedirs(os.path.dirname(self.reports_file), exist_ok=True)
-        with open(self.reports_file, 'w') as f:
-            json.dump(self.reports, f)
+    def _index_report(self, position, report):
+        """
+        Add a report's location to the spatial index and density grid.
+        
+        Returns:
+            tuple: The density grid cell that was updated, or None without a valid location
+        """
+        try:
+            lat, lon = float(report['location']['lat']), float(report['location']['lon'])
+        except (KeyError, TypeError, ValueError):
+            return None
+        self.spatial_index.add(position, lat, lon)
+        return self.density_grid.add(lat, lon, report.get('risk_level'), report.get('timestamp'))
+    
+    def _sync(self, quiet=()):
+        """
+        Pick up reports committed since the last read, including other workers' reports.
+        
+        Reports are applied in log order, so the report list (and the report
+        sequence numbers used as cursors) follow commit order in every worker.
+        Reading the log and applying it happen under one lock, so concurrent
+        syncs cannot apply their batches out of order.
+        
+        Args:
+            quiet (set, optional): IDs of reports to apply without publishing them
+        """
+        with self._lock:
+            records, reloaded = self.store.refresh()
+            if not records and not reloaded:
+                return
+            if reloaded:
+                self._rebuild(records)
+            elif len(records) > STREAM_MAX_BATCH:
+                # Another worker's bulk upload: one summary event keeps the stream buffer from overflowing
+                applied = [report for report in records if self._apply(report) and report.get('id') not in quiet]
+                if applied:
+                    self._publish_bulk(applied)
+            else:
+                for report in records:
+                    self._apply(report, publish=report.get('id') not in quiet)
+    
+    def refresh(self):
+        """Pick up reports committed by other workers."""
+        self._sync()
     
     def add_report(self, report):
         """
@@ -45,14 +168,66 @@ class UserReportService:
         """
         # Add timestamp and ID
         report['timestamp'] = int(time.time())
-        report['id'] = str(len(self.reports) + 1)
+        report['id'] = ReportStore.new_id()
         
-        # Add to reports
-        self.reports.append(report)
-        self._save_reports()
+        # Append to the report log (group-committed with concurrent submissions)
+        self.store.append([report])
+        
+        with self._lock:
+            self._sync()
+            self._apply(report, publish=True)
         
         return report
     
+    def add_reports(self, reports):
+        """
+        Add many user reports with a single group commit.
+        
+        Reports that carry a numeric timestamp (e.g. from partner feeds) keep it;
+        the others are stamped with the current time. Live stream subscribers
+        get a single reports_bulk event for the batch.
+        
+        Args:
+            reports (list): Validated user reports with location, risk_level, and description
+            
+        Returns:
+            list: Added reports with IDs
+        """
+        if not reports:
+            return []
+        
+        now = int(time.time())
+        for report in reports:
+            if not isinstance(report.get('timestamp'), (int, float)):
+                report['timestamp'] = now
+            report['id'] = ReportStore.new_id()
+        
+        self.store.append(reports)
+        
+        with self._lock:
+            # The sync applies these in commit order without publishing them one by one
+            pending = [report for report in reports if report['id'] not in self.report_ids]
+            self._sync(quiet={report['id'] for report in pending})
+            for report in pending:
+                self._apply(report)  # normally a no-op, as the sync has applied them
+            if pending:
+                self._publish_bulk(pending)
+        
+        return reports
+    
+    def version(self):
+        """
+        Identify the current set of reports, e.g. for HTTP validators.
+        
+        Returns:
+            tuple: (version, last_modified) where version changes whenever a report
+                is added and last_modified is the report files' mtime (or None)
+        """
+        self._sync()
+        with self._lock:
+            last_id = self.reports[-1].get('id', '') if self.reports else ''
+            return f"{len(self.reports)}-{last_id}", self.store.last_modified()
+    
     def get_reports(self, limit=100, offset=0):
         """
         Get user reports.
@@ -64,36 +239,133 @@ class UserReportService:
         Returns:
             list: User reports
         """
+        self._sync()
         return self.reports[offset:offset+limit]
     
-    def get_reports_near_location(self, location, radius_km=5):
+    @staticmethod
+    def encode_cursor(timestamp, sequence):
+        """Encode a report's (timestamp, commit sequence number) as an opaque cursor."""
+        return base64.urlsafe_b64encode(f"{timestamp}:{sequence}".encode()).decode().rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Decode a cursor produced by encode_cursor.
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            timestamp, sequence = raw.split(':', 1)
+            timestamp, sequence = float(timestamp), int(sequence)
+            if sequence < 0:
+                raise ValueError(cursor)
+            return (int(timestamp) if timestamp.is_integer() else timestamp, sequence)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f'Invalid cursor: {cursor}') from e
+    
+    def query_reports(self, limit=100, cursor=None, since=None, until=None, fields=None):
+        """
+        Get user reports using keyset pagination.
+        
+        Without since/until, reports come in commit order, so tailing also picks
+        up reports committed late with an older timestamp (e.g. a partner
+        feed's bulk upload). With since/until they come in (timestamp,
+        sequence) order from the time index. Either way a page seeks to the
+        cursor and costs O(log n + limit).
+        
+        Args:
+            limit (int, optional): Maximum number of reports to return. Defaults to 100.
+            cursor (str, optional): Return reports after this cursor.
+            since (float, optional): Only reports with timestamp >= since.
+            until (float, optional): Only reports with timestamp < until.
+            fields (list, optional): Report fields to include. Defaults to all fields.
+            
+        Returns:
+            tuple: (reports, next_cursor, total) where total counts all reports in
+                the since/until range and next_cursor resumes after this page
+                (or repeats the given cursor when there is nothing new)
+        """
+        self._sync()
+        
+        after = self.decode_cursor(cursor) if cursor else None
+        limit = max(limit, 0)
+        
+        with self._lock:
+            if since is None and until is None:
+                start = after[1] + 1 if after else 0
+                positions = range(start, min(start + limit, len(self.reports)))
+                total = len(self.reports)
+            else:
+                time_keys = self._time_index()
+                lo = bisect_left(time_keys, (since,)) if since is not None else 0
+                hi = bisect_left(time_keys, (until,)) if until is not None else len(time_keys)
+                start = max(lo, bisect_right(time_keys, after)) if after else lo
+                positions = [position for _, position in time_keys[start:max(start, min(start + limit, hi))]]
+                total = max(0, hi - lo)
+            
+            reports = [self.reports[position] for position in positions]
+            next_cursor = self.encode_cursor(reports[-1].get('timestamp', 0), positions[-1]) if reports else cursor
+        
+        if fields:
+            reports = [{field: report[field] for field in fields if field in report} for report in reports]
+        
+        return reports, next_cursor, total
+    
+    def report_density(self, lats, lons):
+        """
+        Time-decayed user report density for arrays of points.
+        
+        Reads the in-memory grid only, so it is cheap enough for the risk hot path.
+        
+        Returns:
+            np.ndarray: Density for each point
+        """
+        return self.density_grid.density_many(lats, lons)
+    
+    def count_reports(self):
+        """Return the total number of reports."""
+        self._sync()
+        return len(self.reports)
+    
+    def get_reports_near_location(self, location, radius_km=5, precise=False):
         """
         Get user reports near a location.
         
         Args:
             location (dict): Location with lat and lon
             radius_km (float, optional): Radius in kilometers. Defaults to 5.
+            precise (bool, optional): Use ellipsoidal geodesic distances instead
+                of haversine. Defaults to False.
             
         Returns:
-            list: User reports near the location
+            list: User reports near the location, sorted by distance
         """
-        from geopy.distance import geodesic
+        self._sync()
+        lat, lon = float(location['lat']), float(location['lon'])
         
-        nearby_reports = []
-        
-        for report in self.reports:
-            report_location = (report['location']['lat'], report['location']['lon'])
-            user_location = (location['lat'], location['lon'])
-            
-            distance = geodesic(report_location, user_location).kilometers
+        if precise:
+            from geopy.distance import geodesic
             
-            if distance <= radius_km:
-                report_copy = report.copy()
-                report_copy['distance_km'] = round(distance, 2)
-                nearby_reports.append(report_copy)
+            # Haversine and geodesic differ by well under 1%, so widen the prefilter slightly
+            positions, _ = self.spatial_index.query(lat, lon, radius_km * 1.01)
+            matches = []
+            for position in positions:
+                report = self.reports[position]
+                distance = geodesic((report['location']['lat'], report['location']['lon']), (lat, lon)).kilometers
+                if distance <= radius_km:
+                    matches.append((distance, position))
+            matches.sort()
+        else:
+            positions, distances = self.spatial_index.query(lat, lon, radius_km)
+            matches = zip(distances.tolist(), positions.tolist())
         
-        # Sort by distance
-        nearby_reports.sort(key=lambda x: x['distance_km'])
+        nearby_reports = []
+        for distance, position in matches:
+            report_copy = self.reports[position].copy()
+            report_copy['distance_km'] = round(distance, 2)
+            nearby_reports.append(report_copy)
         
         return nearby_reports
 
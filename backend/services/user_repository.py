@@ -0,0 +1,222 @@
+"""
+SQLite-backed user repository.
+The database runs in WAL mode so readers never block the single writer,
+email is the primary key and legacy tokens have their own index, and each
+worker thread keeps one open connection whose statement cache reuses the
+prepared queries below. Token lookups are served from an in-memory token
+index, dropped whenever PRAGMA data_version shows a commit from another
+connection, so a token check is normally a dictionary lookup.
+"""
+import os
+import sys
+import json
+import sqlite3
+import threading
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATABASE_URL, USERS_FILE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    email TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    password TEXT NOT NULL,
+    token TEXT NOT NULL DEFAULT '',
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_users_token ON users(token) WHERE token != '';
+"""
+
+SELECT_BY_EMAIL = "SELECT email, name, password, token, created_at FROM users WHERE email = ?"
+SELECT_BY_TOKEN = "SELECT email, name, password, token, created_at FROM users WHERE token = ? AND token != ''"
+INSERT_USER = "INSERT INTO users (email, name, password, token, created_at) VALUES (?, ?, ?, ?, ?)"
+UPDATE_TOKEN = "UPDATE users SET token = ? WHERE email = ?"
+CLEAR_TOKEN = "UPDATE users SET token = '' WHERE token = ? AND token != ''"
+
+
+def sqlite_path(database_url):
+    """
+    Resolve a sqlite:/// URL to a file path; relative paths are relative to the backend directory.
+
+    Raises:
+        ValueError: If the URL is not sqlite:/// or names an in-memory database
+    """
+    if not database_url.startswith('sqlite:///'):
+        raise ValueError(f"Unsupported DATABASE_URL (only sqlite:/// is supported): {database_url}")
+    path = database_url[len('sqlite:///'):]
+    if path == ':memory:' or path.startswith('file::memory:'):
+        # Every thread and worker process opens its own connection, so each would get an empty database
+        raise ValueError("DATABASE_URL must name a database file; in-memory databases are not shared between connections")
+    if os.path.isabs(path):
+        return path
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), path)
+
+
+class UserRepository:
+    def __init__(self, database_url=DATABASE_URL, users_file=USERS_FILE):
+        self.path = sqlite_path(database_url)
+        self._local = threading.local()
+        self._tokens = {}     # legacy token -> user
+        self._generation = 0  # bumped whenever the token index is dropped
+        self._tokens_lock = threading.Lock()
+        self._ensure_schema()
+        self.migrate_from_json(users_file)
+
+    def _connection(self):
+        """Return this thread's connection, opening a new one after a fork."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, cached_statements=64)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def _ensure_schema(self):
+        connection = self._connection()
+        with connection:
+            connection.executescript(SCHEMA)
+
+    @staticmethod
+    def _to_dict(row):
+        return dict(row) if row is not None else None
+
+    def migrate_from_json(self, users_file):
+        """
+        Import users from the legacy users.json file (and its change log) into an empty table.
+
+        Returns:
+            int: Number of users imported
+        """
+        log_file = f"{os.path.splitext(users_file)[0]}.log.jsonl"
+        if not os.path.exists(users_file) and not os.path.exists(log_file):
+            return 0
+
+        users = {}
+        try:
+            if os.path.exists(users_file):
+                with open(users_file, 'r') as f:
+                    users = json.load(f)
+            if os.path.exists(log_file):
+                with open(log_file, 'r') as f:
+                    for line in f:
+                        if line.strip():
+                            user = json.loads(line)
+                            users[user['email']] = user
+        except (json.JSONDecodeError, IOError, KeyError) as e:
+            print(f"⚠️ Could not read users file for migration: {e}")
+            return 0
+
+        connection = self._connection()
+        # BEGIN IMMEDIATE so only one worker migrates
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if connection.execute("SELECT 1 FROM users LIMIT 1").fetchone() is not None:
+                connection.rollback()
+                return 0
+            connection.executemany(
+                "INSERT OR IGNORE INTO users (email, name, password, token, created_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (email, user.get('name', ''), user.get('password', ''), user.get('token') or '', user.get('created_at'))
+                    for email, user in users.items()
+                ]
+            )
+            connection.commit()
+        except sqlite3.Error:
+            connection.rollback()
+            raise
+
+        if users:
+            print(f"✅ Migrated {len(users)} users from {users_file} to SQLite")
+        return len(users)
+
+    def get_user(self, email):
+        """Get a user by email, or None."""
+        return self._to_dict(self._connection().execute(SELECT_BY_EMAIL, (email,)).fetchone())
+
+    def _clear_tokens(self):
+        with self._tokens_lock:
+            self._tokens = {}
+            self._generation += 1
+
+    def _check_data_version(self, connection):
+        """Drop the token index if another connection committed since this thread last checked."""
+        version = connection.execute("PRAGMA data_version").fetchone()[0]
+        if getattr(self._local, 'data_version', None) != version:
+            # A thread's first check (e.g. after a fork) has nothing to compare with, so it drops the index too
+            self._clear_tokens()
+            self._local.data_version = version
+
+    def get_user_by_token(self, token):
+        """Get the user holding a legacy token, or None."""
+        if not token:
+            return None
+        connection = self._connection()
+        self._check_data_version(connection)
+        with self._tokens_lock:
+            user = self._tokens.get(token)
+            generation = self._generation
+        if user is not None:
+            return dict(user)
+
+        user = self._to_dict(connection.execute(SELECT_BY_TOKEN, (token,)).fetchone())
+        if user is not None:
+            with self._tokens_lock:
+                # Skip if the index was dropped meanwhile; the row may predate that change
+                if generation == self._generation:
+                    self._tokens[token] = dict(user)
+        return user
+
+    def create_user(self, user):
+        """
+        Create a user unless the email is already registered.
+
+        Args:
+            user (dict): User record including email
+
+        Returns:
+            bool: True if the user was created, False if the email exists
+        """
+        connection = self._connection()
+        try:
+            with connection:
+                connection.execute(INSERT_USER, (
+                    user['email'], user['name'], user['password'],
+                    user.get('token') or '', user.get('created_at')
+                ))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def set_token(self, email, token):
+        """
+        Replace a user's token.
+
+        Returns:
+            bool: True if the user exists
+        """
+        connection = self._connection()
+        with connection:
+            updated = connection.execute(UPDATE_TOKEN, (token, email)).rowcount > 0
+        self._clear_tokens()
+        return updated
+
+    def revoke_token(self, token):
+        """
+        Clear a legacy token from the user holding it.
+
+        Returns:
+            bool: True if the token was found
+        """
+        connection = self._connection()
+        with connection:
+            revoked = connection.execute(CLEAR_TOKEN, (token,)).rowcount > 0
+        self._clear_tokens()
+        return revoked
+
+# Singleton instance
+user_repository = UserRepository()
@@ -0,0 +1,83 @@
+"""
+Tests for the feature engineering pipeline.
+"""
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.feature_engineering import process_daily_rainfall_data
+
+DAYS = ['1st', '2nd', '3rd'] + [f'{day}th' for day in range(4, 21)] + ['21st', '22nd', '23rd'] + \
+       [f'{day}th' for day in range(24, 31)] + ['31st']
+
+
+# process_daily_rainfall_data output for daily_rainfall_frame() from the former
+# row-by-row implementation, whose day-column filter also matched "month"
+FORMER_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures',
+                             'daily_rainfall_former_output.csv')
+
+
+def with_month_as_day(result):
+    """Recompute the aggregates as if the month number were one more daily reading."""
+    month = result['month'].astype(float)
+    total = result['total_rainfall'] + month
+    avg = total / (len(DAYS) + 1)
+    peak = np.maximum(result['max_daily_rainfall'], month)
+    return result.assign(
+        total_rainfall=total,
+        avg_daily_rainfall=avg,
+        max_daily_rainfall=peak,
+        rainy_days_count=result['rainy_days_count'] + (month > 0.1).astype(int),
+        rainfall_intensity=peak / (avg + 0.001),
+        drought_risk=(total < 10).astype(int),
+        flood_risk=(peak > 100).astype(int)
+    )
+
+
+def daily_rainfall_frame():
+    """Six district-months, including dry, flooded, missing and malformed readings."""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        '"state"': ['Kerala', 'Kerala', 'Punjab', 'Punjab', 'Assam', 'Assam'],
+        '"district"': ['Idukki', 'Wayanad', 'Ludhiana', 'Amritsar', 'Cachar', 'Dhubri'],
+        '"month"': [1, 7, 3, 12, 6, 8]
+    })
+    for day in DAYS:
+        df[f'"{day}"'] = rng.gamma(0.4, 8, len(df))
+    df.loc[2, [f'"{day}"' for day in DAYS]] = 0.0          # dry month: drought risk
+    df.loc[4, '"15th"'] = 180.0                              # cloudburst: flood risk
+    df['"3rd"'] = df['"3rd"'].astype(object)
+    df.loc[[0, 1, 3, 5], '"3rd"'] = ['NA', '', ' 12.5 ', None]
+    df.loc[1, '"31st"'] = np.nan
+    return df
+
+
+def test_daily_rainfall_differs_from_former_output_only_by_month():
+    former = pd.read_csv(FORMER_OUTPUT)
+    actual = process_daily_rainfall_data(daily_rainfall_frame())
+    pd.testing.assert_frame_equal(actual[['state', 'district', 'month']], former[['state', 'district', 'month']],
+                                  check_dtype=False)
+    # The former filter added the month number to every total and counted it as a rainy day
+    np.testing.assert_allclose(former['total_rainfall'] - actual['total_rainfall'], former['month'], atol=1e-9)
+    assert (former['rainy_days_count'] - actual['rainy_days_count']).tolist() == [1] * len(former)
+    pd.testing.assert_frame_equal(with_month_as_day(actual), former, check_dtype=False, rtol=1e-9, atol=1e-9)
+    assert actual['drought_risk'].tolist() == [0, 0, 1, 0, 0, 0]
+    assert actual.loc[2, 'total_rainfall'] == 0.0
+    assert actual.loc[4, 'flood_risk'] == 1
+
+
+def test_daily_rainfall_ignores_month_column():
+    df = daily_rainfall_frame()
+    df[[f'"{day}"' for day in DAYS]] = 0.0
+    result = process_daily_rainfall_data(df)
+    assert result['total_rainfall'].tolist() == [0.0] * len(df)
+    assert result['rainy_days_count'].tolist() == [0] * len(df)
+
+
+def test_daily_rainfall_without_day_columns():
+    df = pd.DataFrame({'state': ['Kerala'], 'district': ['Idukki'], 'month': [1]})
+    assert process_daily_rainfall_data(df).empty
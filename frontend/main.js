@@ -2306,10 +2306,12 @@ async function submitRiskReport() {
             return;
         }
         
+        const token = localStorage.getItem('authToken');
         const response = await fetch(`${API_BASE_URL}/report_risk`, {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                ...(token ? { 'Authorization': `Bearer ${token}` } : {})
             },
             body: JSON.stringify({
                 location,
@@ -2318,6 +2320,9 @@ async function submitRiskReport() {
             })
         });
         
+        if (response.status === 401) {
+            throw new Error('Please sign in to submit reports');
+        }
         if (!response.ok) {
             throw new Error('Failed to submit report');
         }